@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Benchmark the processing stages on synthetic blueprints.
+
+Every stage runs in a fresh child process so its peak RSS is measured on its
+own. Results can be saved as a baseline and later runs compared against it;
+the run fails when a stage got slower (or bigger) than the threshold allows.
+
+Usage:
+    python -m benchmarks.run --profile medium --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --profile medium --baseline benchmarks/baseline.json
+"""
+import sys
+import json
+import queue
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import generate_blueprint, sheet_shape
+
+logger = logging.getLogger(__name__)
+
+# How often run_stage checks that the stage process is still alive.
+POLL_INTERVAL_S = 1.0
+
+PROFILES = {
+    "small": {"size": "letter", "dpi": 150, "density": 1.0},
+    "medium": {"size": "d", "dpi": 300, "density": 1.0},
+    "large": {"size": "e", "dpi": 300, "density": 1.5},
+    "e600": {"size": "e", "dpi": 600, "density": 1.0}
+}
+
+
+def _stage_preprocess(image, workdir):
+    from utils.image_tools import preprocess_image
+    return lambda: int(np.count_nonzero(preprocess_image(image)))
+
+
+def _stage_preprocess_tiled(image, workdir):
+    from utils.image_tools import preprocess_image
+    return lambda: int(np.count_nonzero(preprocess_image(image, tile_size=2048)))
+
+
+def _stage_extract_boxes(image, workdir):
+    from utils.image_tools import preprocess_image, extract_boxes
+    mask = preprocess_image(image)
+    return lambda: len(extract_boxes(mask))
+
+
+def _stage_merge_boxes(image, workdir):
+    from utils.image_tools import preprocess_image, extract_boxes, merge_boxes
+    boxes = [tuple(b) for b in extract_boxes(preprocess_image(image)).tolist()]
+    return lambda: len(merge_boxes(boxes))
+
+
+def _stage_detect_symbols(image, workdir):
+    from utils.image_tools import detect_symbols
+    return lambda: len(detect_symbols(image, ocr_mode="page")[1])
+
+
+def _stage_detect_text(image, workdir):
+    from utils.image_tools import detect_text_blocks
+    return lambda: len(detect_text_blocks(image, block_size=4096))
+
+
+def _stage_pdf_convert(image, workdir):
+    from utils.pdf_tools import convert_pdf_pages
+    meta = json.loads((workdir / "sheet.json").read_text())
+    out_dir = workdir / "pdf_out"
+    return lambda: len(convert_pdf_pages(str(workdir / "sheet.pdf"), str(out_dir), dpi=meta["dpi"]))
+
+
+# name -> (setup, external tools it needs)
+STAGES = {
+    "preprocess": (_stage_preprocess, ()),
+    "preprocess_tiled": (_stage_preprocess_tiled, ()),
+    "extract_boxes": (_stage_extract_boxes, ()),
+    "merge_boxes": (_stage_merge_boxes, ()),
+    "detect_symbols": (_stage_detect_symbols, ("tesseract",)),
+    "detect_text": (_stage_detect_text, ("tesseract",)),
+    "pdf_convert": (_stage_pdf_convert, ("pdftoppm",))
+}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(stage, workdir, repeat, results):
+    try:
+        workdir = Path(workdir)
+        image = np.load(workdir / "sheet.npy")
+        run = STAGES[stage][0](image, workdir)
+        times, items = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = run()
+            times.append(time.perf_counter() - start)
+        results.put({"times": times, "items": items, "peak_rss_mb": _peak_rss_mb()})
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_stage(stage, workdir, repeat):
+    """
+    Time one stage in a fresh process; returns its result record.
+
+    A child that dies without reporting (OOM kill, segfault) is recorded as an
+    error with its exit code instead of leaving the benchmark waiting forever.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_child, args=(stage, str(workdir), repeat, results))
+    process.start()
+    while True:
+        try:
+            record = results.get(timeout=POLL_INTERVAL_S)
+            break
+        except queue.Empty:
+            if process.is_alive():
+                continue
+        # The child may have put its result just before exiting.
+        try:
+            record = results.get(timeout=POLL_INTERVAL_S)
+        except queue.Empty:
+            record = {"error": f"stage process exited with code {process.exitcode}", "exitcode": process.exitcode}
+        break
+    process.join()
+    if "error" in record:
+        return record
+    times = record.pop("times")
+    record.update(best_s=min(times), median_s=statistics.median(times), runs=len(times))
+    return record
+
+
+def prepare_sheet(profile, workdir, need_pdf):
+    params = PROFILES[profile]
+    start = time.perf_counter()
+    image, truth = generate_blueprint(**params)
+    np.save(workdir / "sheet.npy", image)
+    (workdir / "sheet.json").write_text(json.dumps({**params, "truth_counts": {k: len(v) for k, v in truth.items()}}))
+    if need_pdf:
+        from PIL import Image
+        Image.fromarray(image).save(workdir / "sheet.pdf", "PDF", resolution=params["dpi"])
+    height, width = image.shape[:2]
+    logger.info(f"Generated {profile} sheet {width}x{height} in {time.perf_counter() - start:.1f}s")
+    return image.shape
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """
+    Stages that regressed against a baseline.
+
+    Returns:
+        list[str]: One message per regression.
+    """
+    regressions = []
+    for stage, record in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or "best_s" not in record or "best_s" not in base:
+            continue
+        ratio = record["best_s"] / base["best_s"] if base["best_s"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append(f"{stage}: {base['best_s']:.3f}s -> {record['best_s']:.3f}s ({ratio - 1:+.0%})")
+        if record.get("peak_rss_mb") and base.get("peak_rss_mb"):
+            mem_ratio = record["peak_rss_mb"] / base["peak_rss_mb"]
+            if mem_ratio > 1 + memory_threshold:
+                regressions.append(f"{stage}: peak RSS {base['peak_rss_mb']:.0f}MB -> "
+                                   f"{record['peak_rss_mb']:.0f}MB ({mem_ratio - 1:+.0%})")
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"\n{'Stage':<18}{'Best s':>10}{'Median s':>10}{'Peak MB':>10}{'Items':>10}{'vs base':>10}")
+    for stage, record in results["stages"].items():
+        if "best_s" not in record:
+            print(f"{stage:<18}  {record.get('skipped') or record.get('error')}")
+            continue
+        base = (baseline or {}).get("stages", {}).get(stage, {})
+        delta = f"{record['best_s'] / base['best_s'] - 1:+.0%}" if base.get("best_s") else ""
+        peak = f"{record['peak_rss_mb']:.0f}" if record.get("peak_rss_mb") else "-"
+        print(f"{stage:<18}{record['best_s']:>10.3f}{record['median_s']:>10.3f}{peak:>10}"
+              f"{record['items']:>10}{delta:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark processing stages on synthetic blueprints.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small", help="Sheet size and resolution")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Stages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--baseline", type=Path, help="Compare against this baseline JSON")
+    parser.add_argument("--save-baseline", type=Path, help="Write the results as a new baseline")
+    parser.add_argument("--output", type=Path, help="Write the results JSON here")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a stage counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.2,
+                        help="Allowed peak RSS growth before a stage counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    height, width = sheet_shape(PROFILES[args.profile]["size"], PROFILES[args.profile]["dpi"])
+    results = {
+        "profile": args.profile,
+        "sheet": {**PROFILES[args.profile], "width": width, "height": height},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": multiprocessing.cpu_count()},
+        "stages": {}
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bv-bench-") as tmp:
+        workdir = Path(tmp)
+        prepare_sheet(args.profile, workdir, need_pdf="pdf_convert" in args.stages)
+        for stage in args.stages:
+            missing = [tool for tool in STAGES[stage][1] if shutil.which(tool) is None]
+            if missing:
+                results["stages"][stage] = {"skipped": f"skipped, {', '.join(missing)} not installed"}
+                logger.warning(f"Skipping {stage}: {', '.join(missing)} not installed")
+                continue
+            logger.info(f"Running {stage}...")
+            results["stages"][stage] = run_stage(stage, workdir, args.repeat)
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("profile") != args.profile:
+            logger.warning(f"Baseline profile '{baseline.get('profile')}' differs from '{args.profile}'")
+    print_results(results, baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2))
+
+    failed = [s for s, r in results["stages"].items() if "error" in r]
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold) if baseline else []
+    for message in regressions:
+        print(f"❌ Regression {message}")
+    for stage in failed:
+        print(f"❌ {stage} failed: {results['stages'][stage]['error']}")
+    if not regressions and not failed:
+        print("✅ No regressions" if baseline else "✅ Done")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Deterministic synthetic blueprints for benchmarking.
+
+A sheet is white paper with a building grid, black linework, legend-style
+symbols, saturated colour swatches and text labels. Everything is drawn from a
+seeded RNG, so the same arguments always produce the same pixels.
+"""
+import cv2
+import numpy as np
+
+# Sheet sizes in inches (width, height), landscape.
+SHEET_SIZES = {
+    "letter": (11, 8.5),
+    "a": (11, 8.5),
+    "b": (17, 11),
+    "c": (22, 17),
+    "d": (34, 22),
+    "e": (44, 34)
+}
+
+SYMBOL_SHAPES = ("circle", "square", "triangle", "diamond", "hexagon", "cross")
+LABEL_PREFIXES = ("D-", "W-", "P-", "E-", "HVAC ", "FD", "LT", "SW")
+
+# Saturated colours picked up by the preprocessing colour mask (RGB).
+SWATCH_COLORS = ((220, 30, 30), (30, 160, 60), (30, 60, 220), (240, 200, 20), (200, 40, 200), (20, 180, 200))
+
+
+def sheet_shape(size="d", dpi=300):
+    """(height, width) in pixels of a sheet size at a resolution."""
+    width_in, height_in = SHEET_SIZES[size]
+    return int(round(height_in * dpi)), int(round(width_in * dpi))
+
+
+def generate_blueprint(size="d", dpi=300, density=1.0, seed=0):
+    """
+    Draw a synthetic blueprint.
+
+    Args:
+        size (str): Sheet size key from SHEET_SIZES, e.g. "e" for 44x34 in.
+        dpi (int): Resolution in pixels per inch.
+        density (float): Scales the number of symbols, swatches and labels;
+            1.0 is about 2 symbols per square inch.
+        seed (int): RNG seed.
+
+    Returns:
+        tuple[np.ndarray, dict]: RGB image and ground truth with "symbols",
+            "swatches" and "labels" boxes as (x1, y1, x2, y2).
+    """
+    rng = np.random.default_rng(seed)
+    height, width = sheet_shape(size, dpi)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    unit = dpi / 100  # drawing unit: 1/100 inch
+    line = max(1, int(round(unit)))
+    area_in = (height / dpi) * (width / dpi)
+
+    _draw_grid(image, rng, unit, line)
+    _draw_walls(image, rng, unit, line, count=int(area_in * 0.3 * density))
+
+    truth = {"symbols": [], "swatches": [], "labels": []}
+    for _ in range(int(area_in * 2 * density)):
+        truth["symbols"].append(_draw_symbol(image, rng, unit, line))
+    for _ in range(int(area_in * 0.2 * density)):
+        truth["swatches"].append(_draw_swatch(image, rng, unit, line))
+    for _ in range(int(area_in * 1.5 * density)):
+        truth["labels"].append(_draw_label(image, rng, unit, line))
+    return image, truth
+
+
+def _draw_grid(image, rng, unit, line):
+    height, width = image.shape[:2]
+    spacing = int(rng.integers(150, 250) * unit)
+    color = (170, 170, 200)
+    for x in range(spacing, width, spacing):
+        cv2.line(image, (x, 0), (x, height - 1), color, line)
+    for y in range(spacing, height, spacing):
+        cv2.line(image, (0, y), (width - 1, y), color, line)
+
+
+def _draw_walls(image, rng, unit, line, count):
+    height, width = image.shape[:2]
+    for _ in range(count):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        length = int(rng.integers(100, 600) * unit)
+        if rng.random() < 0.5:
+            end = (min(width - 1, x + length), y)
+        else:
+            end = (x, min(height - 1, y + length))
+        cv2.line(image, (x, y), end, (0, 0, 0), line * int(rng.integers(2, 5)))
+
+
+def _draw_symbol(image, rng, unit, line):
+    height, width = image.shape[:2]
+    size = int(rng.integers(15, 40) * unit)
+    x1 = int(rng.integers(0, max(1, width - size)))
+    y1 = int(rng.integers(0, max(1, height - size)))
+    x2, y2 = x1 + size, y1 + size
+    cx, cy, r = (x1 + x2) // 2, (y1 + y2) // 2, size // 2
+    shape = SYMBOL_SHAPES[rng.integers(len(SYMBOL_SHAPES))]
+    color = (0, 0, 0) if rng.random() < 0.7 else SWATCH_COLORS[rng.integers(len(SWATCH_COLORS))]
+    thickness = line * 2
+
+    if shape == "circle":
+        cv2.circle(image, (cx, cy), r, color, thickness)
+    elif shape == "square":
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+    elif shape == "cross":
+        cv2.line(image, (x1, y1), (x2, y2), color, thickness)
+        cv2.line(image, (x1, y2), (x2, y1), color, thickness)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+    else:
+        sides = {"triangle": 3, "diamond": 4, "hexagon": 6}[shape]
+        angles = np.arange(sides) * 2 * np.pi / sides - np.pi / 2
+        pts = np.stack([cx + r * np.cos(angles), cy + r * np.sin(angles)], axis=1).astype(np.int32)
+        cv2.polylines(image, [pts], True, color, thickness)
+    return x1, y1, x2, y2
+
+
+def _draw_swatch(image, rng, unit, line):
+    height, width = image.shape[:2]
+    w, h = int(rng.integers(40, 120) * unit), int(rng.integers(20, 60) * unit)
+    x1 = int(rng.integers(0, max(1, width - w)))
+    y1 = int(rng.integers(0, max(1, height - h)))
+    color = SWATCH_COLORS[rng.integers(len(SWATCH_COLORS))]
+    cv2.rectangle(image, (x1, y1), (x1 + w, y1 + h), color, -1)
+    cv2.rectangle(image, (x1, y1), (x1 + w, y1 + h), (0, 0, 0), line)
+    return x1, y1, x1 + w, y1 + h
+
+
+def _draw_label(image, rng, unit, line):
+    height, width = image.shape[:2]
+    text = f"{LABEL_PREFIXES[rng.integers(len(LABEL_PREFIXES))]}{int(rng.integers(1, 999)):03d}"
+    scale = unit * rng.uniform(0.35, 0.6)
+    thickness = max(1, line)
+    (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    x = int(rng.integers(0, max(1, width - tw)))
+    y = int(rng.integers(th, max(th + 1, height - baseline)))
+    cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+    return x, y - th, x + tw, y + baseline
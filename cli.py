@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Headless batch analysis: PDF conversion, symbol detection and OCR over a
+directory of sheets, without starting the Tkinter UI.
+
+Usage:
+    python cli.py blueprints/ --output results/ --ocr-mode page --workers 8
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from utils.config import load_configuration, get_default_config
+from utils import instrumentation
+from utils.image_tools import detect_symbols, detect_text_blocks, text_height_at
+from utils.logging_setup import setup_logging
+from utils.ocr_pool import OCRPool
+from utils.pdf_tools import convert_pdf_pages
+from utils.result_cache import ResultCache
+from utils.symbol_matcher import SymbolMatcher
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+
+class StageStats:
+    """Wall-clock latency samples and item counts per pipeline stage, and the inputs that failed."""
+
+    def __init__(self):
+        self.samples = {}
+        self.failures = []
+
+    def record(self, stage, seconds, items=1):
+        self.samples.setdefault(stage, []).append((seconds, items))
+
+    def record_failure(self, stage, source, error):
+        self.failures.append({"stage": stage, "source": str(source), "error": str(error)})
+
+    def time(self, stage):
+        return _StageTimer(self, stage)
+
+    def summary(self):
+        result = {}
+        for stage, samples in self.samples.items():
+            latencies = np.array([s for s, _ in samples])
+            items = sum(n for _, n in samples)
+            total = float(latencies.sum())
+            result[stage] = {
+                "calls": len(samples),
+                "items": items,
+                "total_s": total,
+                "mean_ms": float(latencies.mean() * 1000),
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p95_ms": float(np.percentile(latencies, 95) * 1000),
+                "max_ms": float(latencies.max() * 1000),
+                "items_per_s": items / total if total else 0.0
+            }
+        return result
+
+
+class _StageTimer:
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+        self.items = 1
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.stats.record(self.stage, time.perf_counter() - self.start, self.items)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def collect_sheets(input_dir, raster_dir, dpi, stats):
+    """
+    Yield image paths for every sheet, rasterizing PDFs page by page.
+
+    A PDF that cannot be converted is recorded as a failure in stats and
+    skipped, so the remaining inputs are still processed.
+    """
+    for path in sorted(Path(input_dir).iterdir()):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_SUFFIXES:
+            yield path
+        elif suffix == ".pdf":
+            try:
+                with stats.time("convert_pdf") as timer:
+                    pages = convert_pdf_pages(str(path), str(raster_dir), dpi=dpi)
+                    timer.items = len(pages)
+            except Exception as e:
+                stats.record_failure("convert_pdf", path, e)
+                logger.error(f"❌ Error converting {path}: {e}")
+                continue
+            for page in pages:
+                yield Path(page)
+
+
+def analyze_sheet(image_path, args, stats, pool, cache, matcher=None, limits=None):
+    with stats.time("decode"):
+        image = cv2.imread(str(image_path))
+        if image is None:
+            raise ValueError(f"Could not read image {image_path}")
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+    result = {"image": str(image_path), "width": image.shape[1], "height": image.shape[0]}
+
+    if not args.skip_ocr:
+        with stats.time("ocr") as timer:
+            result["text"] = detect_text_blocks(image, args.ocr_block_size, pool=pool, cache=cache,
+                                                proposals=args.text_proposals,
+                                                text_height=text_height_at(args.dpi))
+            timer.items = len(result["text"])
+
+    with stats.time("detect_symbols") as timer:
+        _, result["symbols"] = detect_symbols(image, min_area=args.min_area, tile_size=args.tile_size,
+                                              ocr_mode=args.ocr_mode, ocr_block_size=args.ocr_block_size,
+                                              pool=pool, cache=cache, **(limits or {}))
+        timer.items = len(result["symbols"])
+
+    if matcher is not None:
+        with stats.time("match_symbols") as timer:
+            result["matches"] = matcher.match(image)
+            timer.items = len(result["matches"])
+    return result
+
+
+def write_result(result, output_dir, fmt, jsonl_file):
+    if fmt == "jsonl":
+        jsonl_file.write(json.dumps(result, default=_json_default) + "\n")
+    else:
+        out_path = Path(output_dir) / f"{Path(result['image']).stem}.json"
+        with open(out_path, "w") as f:
+            json.dump(result, f, indent=2, default=_json_default)
+
+
+def print_summary(summary, sheets, elapsed):
+    print(f"\n{sheets} sheets in {elapsed:.2f}s ({sheets / elapsed if elapsed else 0:.2f} sheets/s)")
+    print(f"{'stage':<16}{'calls':>7}{'items':>9}{'total s':>10}{'mean ms':>10}"
+          f"{'p95 ms':>10}{'max ms':>10}{'items/s':>10}")
+    for stage, s in summary.items():
+        print(f"{stage:<16}{s['calls']:>7}{s['items']:>9}{s['total_s']:>10.2f}{s['mean_ms']:>10.1f}"
+              f"{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}{s['items_per_s']:>10.1f}")
+
+
+def parse_args(argv=None):
+    defaults = get_default_config()
+    parser = argparse.ArgumentParser(description="Headless blueprint symbol and text detection.")
+    parser.add_argument("input_dir", help="Directory with PDF and/or image sheets")
+    parser.add_argument("-o", "--output", default=defaults["paths"]["output_dir"],
+                        help="Directory for detection results")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="One JSON file per sheet, or a single detections.jsonl")
+    parser.add_argument("--config", type=Path, help="YAML configuration file")
+    parser.add_argument("--dpi", type=int, default=600, help="PDF rasterization resolution")
+    parser.add_argument("--min-area", type=int, default=50, help="Minimum symbol box area")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Preprocess in tiles of this size to bound memory")
+    parser.add_argument("--ocr-mode", choices=["per_box", "page"], default="page",
+                        help="OCR every symbol box, or the page once")
+    parser.add_argument("--ocr-block-size", type=int, default=None,
+                        help="OCR the page in blocks of this size")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="OCR worker processes (0 runs OCR in-process)")
+    parser.add_argument("--skip-ocr", action="store_true", help="Skip the full-sheet OCR stage")
+    parser.add_argument("--text-proposals", action="store_true",
+                        help="OCR only likely text lines, packed into one mosaic, in the full-sheet OCR stage; "
+                             "text size is derived from --dpi")
+    parser.add_argument("--icon-dir", type=Path, default=None,
+                        help="Locate the legend icons in this directory on every sheet")
+    parser.add_argument("--match-threshold", type=float, default=0.8,
+                        help="Minimum correlation for a legend icon match")
+    parser.add_argument("--bounded", action="store_true",
+                        help="Score candidate boxes and keep at most processing.max_symbols scoring "
+                             "processing.detection_threshold or more, before OCR")
+    parser.add_argument("--trace", type=Path, default=None,
+                        help="Record spans and counters and write a Chrome trace JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(logging.INFO)
+    config = load_configuration(args.config) if args.config else get_default_config()
+    if args.trace:
+        instrumentation.enable()
+
+    output_dir = Path(args.output)
+    raster_dir = Path(config["paths"]["temp_dir"]) / "rasters"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    stats = StageStats()
+    cache = ResultCache()
+    pool = OCRPool(max_workers=args.workers) if args.workers != 0 else None
+    matcher = SymbolMatcher.from_directory(args.icon_dir, threshold=args.match_threshold) if args.icon_dir else None
+    jsonl_file = open(output_dir / "detections.jsonl", "w") if args.format == "jsonl" else None
+    limits = None
+    if args.bounded:
+        limits = {"score_threshold": config["processing"]["detection_threshold"],
+                  "max_symbols": config["processing"]["max_symbols"]}
+
+    start = time.perf_counter()
+    sheets = 0
+    try:
+        for image_path in collect_sheets(args.input_dir, raster_dir, args.dpi, stats):
+            try:
+                result = analyze_sheet(image_path, args, stats, pool, cache, matcher, limits)
+                write_result(result, output_dir, args.format, jsonl_file)
+                sheets += 1
+                logger.info(f"✔ {image_path.name}: {len(result['symbols'])} symbols")
+            except Exception as e:
+                stats.record_failure("analyze", image_path, e)
+                logger.error(f"❌ Error processing {image_path}: {e}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if jsonl_file is not None:
+            jsonl_file.close()
+
+    elapsed = time.perf_counter() - start
+    summary = stats.summary()
+    with open(output_dir / "summary.json", "w") as f:
+        json.dump({"sheets": sheets, "failures": len(stats.failures), "failed": stats.failures,
+                   "seconds": elapsed, "stages": summary, "cache": cache.stats()}, f, indent=2)
+    print_summary(summary, sheets, elapsed)
+    if args.trace:
+        instrumentation.log_summary()
+        instrumentation.export_chrome_trace(args.trace)
+    return 1 if stats.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
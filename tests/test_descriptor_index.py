@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+
+from utils.descriptor_index import DescriptorIndex
+
+
+def _write_icons(icon_dir):
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        icon = np.full((64, 64, 3), 255, np.uint8)
+        for _ in range(6):
+            x1, y1, x2, y2 = (int(v) for v in rng.integers(4, 60, 4))
+            cv2.line(icon, (x1, y1), (x2, y2), (0, 0, 0), 2)
+        cv2.imwrite(str(icon_dir / f"symbol{i}.png"), icon)
+    # A blank icon has no ORB features and is left out of the index.
+    cv2.imwrite(str(icon_dir / "blank.png"), np.full((64, 64, 3), 255, np.uint8))
+
+
+def test_index_with_unindexable_icon_is_reused(tmp_path, monkeypatch):
+    _write_icons(tmp_path)
+    index = DescriptorIndex.load_or_build(tmp_path)
+    assert "blank" not in index.labels
+    saved = index.path.stat().st_mtime_ns
+
+    def fail_build(*args, **kwargs):
+        raise AssertionError("index was rebuilt although no icon changed")
+
+    monkeypatch.setattr(DescriptorIndex, "build", classmethod(fail_build))
+    reused = DescriptorIndex.load_or_build(tmp_path)
+    assert reused.path == index.path
+    assert reused.path.stat().st_mtime_ns == saved
+
+
+def test_index_is_rebuilt_when_an_icon_is_added(tmp_path):
+    _write_icons(tmp_path)
+    DescriptorIndex.load_or_build(tmp_path)
+    cv2.imwrite(str(tmp_path / "extra.png"), cv2.imread(str(tmp_path / "symbol0.png")))
+    assert "extra" in DescriptorIndex.load_or_build(tmp_path).labels
@@ -0,0 +1,23 @@
+from utils.image_tools import merge_boxes
+
+
+def test_evenly_spaced_row_does_not_chain():
+    # Neighbours are 15 px apart (within tolerance), but a cluster stays
+    # anchored at its first corner, so only pairs merge.
+    row = [(15 * i, 0, 15 * i + 10, 10) for i in range(200)]
+    merged = merge_boxes(row)
+    assert len(merged) == 100
+    assert max(x2 - x1 for x1, _, x2, _ in merged) <= 25
+
+
+def test_evenly_spaced_grid_does_not_chain():
+    grid = [(15 * i, 15 * j, 15 * i + 10, 15 * j + 10) for i in range(100) for j in range(100)]
+    merged = merge_boxes(grid)
+    assert len(merged) == 2500
+    assert max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in merged) <= 25
+
+
+def test_result_does_not_depend_on_input_order():
+    boxes = [(0, 0, 10, 10), (12, 5, 30, 20), (25, 0, 40, 8), (100, 100, 110, 110)]
+    assert merge_boxes(boxes) == merge_boxes(boxes[::-1])
+    assert merge_boxes(boxes) == [(0, 0, 30, 20), (25, 0, 40, 8), (100, 100, 110, 110)]
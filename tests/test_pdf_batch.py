@@ -0,0 +1,42 @@
+import os
+import multiprocessing
+
+import pytest
+
+from utils import pdf_tools
+
+PAGES = 6
+_kill_log = None
+
+
+def _stub_convert(pdf_path, page, output_folder, dpi, image_format):
+    """Stand-in for _convert_page_job whose worker dies on a.pdf page 2."""
+    if os.path.basename(pdf_path) == "a.pdf" and page == 2:
+        with open(_kill_log, "a") as f:
+            f.write("killed\n")
+        os._exit(1)
+    return [f"{pdf_path}:{page}"]
+
+
+# The stub is patched into this process, so workers only see it when forked.
+@pytest.mark.skipif(multiprocessing.get_context().get_start_method() != "fork",
+                    reason="needs fork-started pool workers")
+@pytest.mark.parametrize("retries", [0, 2])
+def test_worker_killed_by_one_page_fails_only_that_page(tmp_path, monkeypatch, retries):
+    global _kill_log
+    _kill_log = str(tmp_path / "kills.log")
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (input_dir / name).touch()
+    monkeypatch.setattr(pdf_tools, "get_page_sizes", lambda path: {p: (612, 792) for p in range(1, PAGES + 1)})
+    monkeypatch.setattr(pdf_tools, "_convert_page_job", _stub_convert)
+
+    summary = pdf_tools.convert_pdfs_to_images_parallel(str(input_dir), str(tmp_path / "out"),
+                                                        max_workers=4, retries=retries)
+
+    assert summary["failed"] == {"a.pdf": [2]}
+    assert summary["pages"] == 2 * PAGES - 1
+    # One break while running alongside other pages, then one per attempt alone.
+    with open(_kill_log) as f:
+        assert len(f.readlines()) <= retries + 2
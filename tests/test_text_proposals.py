@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_blueprint
+from utils.image_tools import propose_text_regions, text_height_at
+
+
+def _ink_coverage(image, label, boxes):
+    """Share of a label's dark pixels that fall inside any proposal."""
+    x1, y1, x2, y2 = label
+    covered = np.zeros((y2 - y1, x2 - x1), bool)
+    for bx1, by1, bx2, by2 in boxes:
+        cx1, cy1, cx2, cy2 = max(bx1, x1), max(by1, y1), min(bx2, x2), min(by2, y2)
+        if cx1 < cx2 and cy1 < cy2:
+            covered[cy1 - y1:cy2 - y1, cx1 - x1:cx2 - x1] = True
+    ink = image[y1:y2, x1:x2].min(axis=2) < 128
+    return covered[ink].mean() if ink.any() else 1.0
+
+
+@pytest.mark.parametrize("dpi", [300, 600])
+def test_proposals_cover_labels_at_sheet_dpi(dpi):
+    image, truth = generate_blueprint("a", dpi, seed=5)
+    boxes = propose_text_regions(image, text_height=text_height_at(dpi))
+
+    coverage = np.array([_ink_coverage(image, label, boxes) for label in truth["labels"]])
+    assert (coverage >= 0.9).mean() >= 0.85
+    # Proposals stay a small part of the sheet, or OCR would save nothing.
+    area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    assert area < 0.5 * image.shape[0] * image.shape[1]
@@ -1,11 +1,12 @@
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
 import tkinter as tk
 import os
 import json
 import logging
 from utils.state_manager import state
+from utils.pdf_tools import render_pdf_region, DETAIL_DPI
+from ui.viewport_renderer import ViewportRenderer
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +16,9 @@ class LegendSelector:
         self.on_done = on_done
         self.image_path = image_path
 
-        # Load image
-        self.cv_image_full = cv2.imread(image_path)
-        self.cv_image_full = cv2.cvtColor(self.cv_image_full, cv2.COLOR_BGR2RGB)
+        # Load image (decoded once and shared with later stages)
+        self.cv_image_full = state.images.acquire(image_path)
+        self.held_images = [image_path]
         self.original_size = self.cv_image_full.shape[1], self.cv_image_full.shape[0]
 
         # Scaling and centering
@@ -35,8 +36,7 @@ class LegendSelector:
         # Canvas setup
         self.canvas = tk.Canvas(root, bg='white')
         self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.tk_image_ref = None
-        self.image_on_canvas = None
+        self.renderer = ViewportRenderer(self.canvas, self.cv_image_full)
 
         # Event bindings
         self.bind_events()
@@ -63,10 +63,17 @@ class LegendSelector:
         self.canvas.bind("<Configure>", self.render_image)
 
         # Global bindings to ensure arrow keys work
-        self.root.bind_all("<Left>", lambda e: self.canvas.xview_scroll(-1, "units"))
-        self.root.bind_all("<Right>", lambda e: self.canvas.xview_scroll(1, "units"))
-        self.root.bind_all("<Up>", lambda e: self.canvas.yview_scroll(-1, "units"))
-        self.root.bind_all("<Down>", lambda e: self.canvas.yview_scroll(1, "units"))
+        self.root.bind_all("<Left>", lambda e: self.scroll(-1, 0))
+        self.root.bind_all("<Right>", lambda e: self.scroll(1, 0))
+        self.root.bind_all("<Up>", lambda e: self.scroll(0, -1))
+        self.root.bind_all("<Down>", lambda e: self.scroll(0, 1))
+
+    def scroll(self, dx, dy):
+        if dx:
+            self.canvas.xview_scroll(dx, "units")
+        if dy:
+            self.canvas.yview_scroll(dy, "units")
+        self.render_image()
 
     def on_mouse_down(self, event):
         if self.legend_bbox_original or self.zoomed:
@@ -117,10 +124,20 @@ class LegendSelector:
 
         self.zoomed = True
         x1, y1, x2, y2 = self.legend_bbox_original
-        crop = self.cv_image_full[y1:y2, x1:x2]
+
+        out_dir = state.config.get("paths", {}).get("legend_dir", "legend_symbols")
+        os.makedirs(out_dir, exist_ok=True)
+        image_path = os.path.join(out_dir, "legend_area.png")
+        bbox_path = os.path.join(out_dir, "legend_bbox.json")
+
+        # Registered under the legend path, so the symbol linker picks it up
+        # without decoding the PNG written below.
+        crop = self.render_detail((x1, y1, x2, y2), image_path)
+        self.held_images.append(image_path)
         h, w = crop.shape[:2]
         self.cv_image_full = crop
         self.original_size = (w, h)
+        self.renderer.set_image(crop)
         self.scale = min(self.root.winfo_width() / w, self.root.winfo_height() / h)
 
         self.legend_bbox_original = None
@@ -128,12 +145,6 @@ class LegendSelector:
         self.render_image()
 
         # Save cropped image and bbox
-        out_dir = state.config.get("paths", {}).get("legend_dir", "legend_symbols")
-        os.makedirs(out_dir, exist_ok=True)
-
-        image_path = os.path.join(out_dir, "legend_area.png")
-        bbox_path = os.path.join(out_dir, "legend_bbox.json")
-
         try:
             cv2.imwrite(image_path, cv2.cvtColor(crop, cv2.COLOR_RGB2BGR))
             with open(bbox_path, "w") as f:
@@ -151,6 +162,30 @@ class LegendSelector:
         except Exception as e:
             logger.error(f"Error saving legend data: {e}")
 
+    def render_detail(self, bbox, key):
+        """
+        Register and acquire the legend region under `key`.
+
+        For a PDF rasterized at overview resolution the region is re-rendered
+        from the PDF at the detail DPI; otherwise (or if that fails) it is a
+        zero-copy view of the loaded image.
+        """
+        detail_dpi = state.config.get("processing", {}).get("detail_dpi", DETAIL_DPI)
+        if state.source_pdf and self.image_path == state.image_path and 0 < state.raster_dpi < detail_dpi:
+            try:
+                region = render_pdf_region(state.source_pdf, bbox, state.raster_dpi, dpi=detail_dpi)
+                logger.info(f"Legend re-rendered at {detail_dpi} DPI: {region.shape[1]}x{region.shape[0]}")
+                state.images.register(key, region)
+                return state.images.acquire(key)
+            except Exception as e:
+                logger.warning(f"Could not re-render legend from {state.source_pdf}, using overview pixels: {e}")
+        return state.images.crop(self.image_path, bbox, crop_key=key)
+
+    def release_images(self):
+        for key in self.held_images:
+            state.images.release(key)
+        self.held_images.clear()
+
     def reset_selection(self, event=None):
         # Immediately reset all selection-related states
         self.legend_bbox_original = None
@@ -160,12 +195,10 @@ class LegendSelector:
         self.render_image()
 
     def render_image(self, event=None):
+        # Only the tiles inside the visible canvas area are built, from the
+        # pyramid level closest to the current scale.
         w = max(1, int(self.original_size[0] * self.scale))
         h = max(1, int(self.original_size[1] * self.scale))
-        resized = cv2.resize(self.cv_image_full, (w, h), interpolation=cv2.INTER_AREA)
-
-        pil_image = Image.fromarray(resized)
-        self.tk_image_ref = ImageTk.PhotoImage(pil_image)
 
         canvas_w = self.canvas.winfo_width()
         canvas_h = self.canvas.winfo_height()
@@ -173,14 +206,8 @@ class LegendSelector:
         offset_y = max((canvas_h - h) // 2, 0)
         self.offset = (offset_x, offset_y)
 
-        if self.image_on_canvas:
-            self.canvas.itemconfig(self.image_on_canvas, image=self.tk_image_ref)
-            self.canvas.coords(self.image_on_canvas, offset_x, offset_y)
-        else:
-            self.image_on_canvas = self.canvas.create_image(offset_x, offset_y, anchor=tk.NW, image=self.tk_image_ref)
-
-        self.canvas.image = self.tk_image_ref
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        self.canvas.config(scrollregion=(0, 0, offset_x + w, offset_y + h))
+        self.renderer.render(self.scale, self.offset)
 
     def zoom_in(self, event=None):
         self.scale *= 1.1
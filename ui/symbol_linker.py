@@ -1,14 +1,20 @@
 import tkinter as tk
 from tkinter import Toplevel
-from PIL import Image, ImageTk
 import cv2
 import numpy as np
 import pytesseract
 import json
 import os
 import logging
-from utils.image_tools import detect_symbols, detect_text
+from utils.image_tools import detect_symbols, detect_text, DetectionCancelled
+from utils.detection_table import WordTable
+from utils.legend_index import LegendIndex
+from utils.ocr_pool import get_ocr_pool
+from utils.result_cache import get_result_cache
 from utils.state_manager import state
+from utils.background_worker import BackgroundWorker
+from utils.instrumentation import span
+from ui.viewport_renderer import ViewportRenderer
 
 
 class SymbolLinker:
@@ -24,8 +30,8 @@ class SymbolLinker:
         if not legend_path or not os.path.exists(legend_path):
             raise FileNotFoundError(f"Legend image not found at {legend_path}")
 
-        self.legend_crop = cv2.imread(legend_path)
-        self.legend_crop = cv2.cvtColor(self.legend_crop, cv2.COLOR_BGR2RGB)
+        self.legend_crop = state.images.acquire(legend_path)
+        self.legend_key = legend_path
         self.zoom_factor = 1.0
 
         self.main_frame = tk.Frame(self.root)
@@ -37,8 +43,9 @@ class SymbolLinker:
         self.side_panel = tk.Frame(self.main_frame, width=500, bg="black")
         self.side_panel.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.tk_image = None
-        self.image_on_canvas = None
+        self.renderer = ViewportRenderer(self.canvas, self.legend_crop)
+        self.fit_scale = 1.0
+        self.pan_start = None
 
         self.image_x_offset = 0
         self.image_y_offset = 0
@@ -51,10 +58,20 @@ class SymbolLinker:
         self.start_x = self.start_y = 0
         self.selecting = False
         self.detection_mode = "symbol"
+        self.cache = get_result_cache(state.config.get("paths", {}).get("cache_dir", "cache"))
+        self.worker = BackgroundWorker("symbol-detection")
+
+        # The whole legend is analysed once in the background; selections are
+        # then answered from the index, falling back to detection on the
+        # selected pixels until it is ready or when it finds nothing there.
+        self.legend_index = None
+        self.index_worker = BackgroundWorker("legend-index")
+        self.index_worker.submit(self.build_index, self.legend_crop)
 
         self.setup_controls()
         self.bind_keys()
-        self.root.after(50, self.render_image)
+        self.root.after(50, self.fit_to_window)
+        self.poll_id = self.root.after(50, self.poll_detection)
         self.root.bind("<Escape>", self.exit_application)
 
         logging.info(f"Legend loaded from: {legend_path}")
@@ -66,6 +83,8 @@ class SymbolLinker:
         tk.Button(ctrl, text="🧽 Clear Last", command=self.clear_last).pack(pady=2, fill=tk.X)
         tk.Button(ctrl, text="❌ Clear All", command=self.clear_all).pack(pady=2, fill=tk.X)
         tk.Button(ctrl, text="↩ Save & Exit", command=self.save_and_continue).pack(pady=2, fill=tk.X)
+        self.status_label = tk.Label(self.side_panel, text="", bg="black", fg="yellow")
+        self.status_label.pack(fill=tk.X)
         self.link_table = tk.Listbox(self.side_panel, bg="white", fg="black")
         self.link_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
@@ -75,12 +94,22 @@ class SymbolLinker:
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
+        self.canvas.bind("<ButtonPress-2>", self.on_pan_start)
+        self.canvas.bind("<B2-Motion>", self.on_pan_drag)
+        self.canvas.bind("<MouseWheel>", lambda e: self.zoom(1.1 if e.delta > 0 else 1 / 1.1, e.x, e.y))
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(1.1, e.x, e.y))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(1 / 1.1, e.x, e.y))
+        self.canvas.bind("<Left>", lambda e: self.pan(50, 0))
+        self.canvas.bind("<Right>", lambda e: self.pan(-50, 0))
+        self.canvas.bind("<Up>", lambda e: self.pan(0, 50))
+        self.canvas.bind("<Down>", lambda e: self.pan(0, -50))
+        self.canvas.focus_set()
 
     def exit_application(self, event=None):
         logging.info("Exiting application")
         self.root.quit()
 
-    def render_image(self):
+    def fit_to_window(self):
         canvas_width = self.root.winfo_width() - 500
         canvas_height = self.root.winfo_height()
         h, w = self.legend_crop.shape[:2]
@@ -93,21 +122,51 @@ class SymbolLinker:
             fit_w = canvas_width
             fit_h = int(canvas_width / aspect)
 
-        resized = cv2.resize(self.legend_crop, (fit_w, fit_h), interpolation=cv2.INTER_AREA)
-        self.display_crop = resized.copy()
-        self.image_scale = self.legend_crop.shape[1] / fit_w
+        self.fit_scale = fit_w / w
+        self.zoom_factor = 1.0
+        self.image_scale = 1 / self.fit_scale
         self.image_x_offset = (canvas_width - fit_w) // 2 + 250
         self.image_y_offset = (canvas_height - fit_h) // 2
 
-        self.canvas.delete("all")
-        self.tk_image = ImageTk.PhotoImage(Image.fromarray(self.display_crop))
-        self.image_on_canvas = self.canvas.create_image(
-            self.image_x_offset, self.image_y_offset, anchor=tk.NW, image=self.tk_image
-        )
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        self.render_image()
         self.redraw_links()
 
+    def render_image(self):
+        # Tiles are cached per zoom level by the renderer; link overlays are
+        # not touched here, zoom() and pan() transform them in place.
+        self.renderer.render(1 / self.image_scale, (self.image_x_offset, self.image_y_offset))
+
+    def zoom(self, factor, anchor_x=None, anchor_y=None):
+        """Zoom by factor around a canvas point (the canvas centre by default)."""
+        if anchor_x is None:
+            anchor_x = self.canvas.winfo_width() / 2
+            anchor_y = self.canvas.winfo_height() / 2
+
+        self.zoom_factor *= factor
+        self.image_scale = 1 / (self.fit_scale * self.zoom_factor)
+        self.image_x_offset = anchor_x + (self.image_x_offset - anchor_x) * factor
+        self.image_y_offset = anchor_y + (self.image_y_offset - anchor_y) * factor
+        self.canvas.scale("overlay", anchor_x, anchor_y, factor, factor)
+        self.render_image()
+
+    def pan(self, dx, dy):
+        self.image_x_offset += dx
+        self.image_y_offset += dy
+        self.canvas.move("overlay", dx, dy)
+        self.render_image()
+
+    def on_pan_start(self, event):
+        self.pan_start = (event.x, event.y)
+
+    def on_pan_drag(self, event):
+        if self.pan_start:
+            dx, dy = event.x - self.pan_start[0], event.y - self.pan_start[1]
+            self.pan_start = (event.x, event.y)
+            self.pan(dx, dy)
+
     def redraw_links(self):
+        self.canvas.delete("overlay")
+        self.visual_elements.clear()
         for idx, link in enumerate(self.links):
             self.draw_link(link)
 
@@ -125,14 +184,14 @@ class SymbolLinker:
         tx2 = (tx + tw) / self.image_scale + self.image_x_offset
         ty2 = (ty + th) / self.image_scale + self.image_y_offset
 
-        rect1 = self.canvas.create_rectangle(sx1, sy1, sx2, sy2, outline="lime", width=2)
-        rect2 = self.canvas.create_rectangle(tx1, ty1, tx2, ty2, outline="lime", width=2)
+        rect1 = self.canvas.create_rectangle(sx1, sy1, sx2, sy2, outline="lime", width=2, tags=("overlay",))
+        rect2 = self.canvas.create_rectangle(tx1, ty1, tx2, ty2, outline="lime", width=2, tags=("overlay",))
 
         line = self.canvas.create_line((sx + sw) / self.image_scale + self.image_x_offset,
                                 (sy + sh // 2) / self.image_scale + self.image_y_offset,
                                 (tx) / self.image_scale + self.image_x_offset,
                                 (ty + th // 2) / self.image_scale + self.image_y_offset,
-                                fill="red", width=2)
+                                fill="red", width=2, tags=("overlay",))
         
         self.visual_elements.append([rect1, rect2, line])
 
@@ -154,8 +213,8 @@ class SymbolLinker:
             self.canvas.delete(self.selection_box)
             self.selection_box = None
 
-        x1 = int((min(self.start_x, event.x) - self.image_x_offset) * self.image_scale)
-        y1 = int((min(self.start_y, event.y) - self.image_y_offset) * self.image_scale)
+        x1 = max(0, int((min(self.start_x, event.x) - self.image_x_offset) * self.image_scale))
+        y1 = max(0, int((min(self.start_y, event.y) - self.image_y_offset) * self.image_scale))
         x2 = int((max(self.start_x, event.x) - self.image_x_offset) * self.image_scale)
         y2 = int((max(self.start_y, event.y) - self.image_y_offset) * self.image_scale)
 
@@ -163,73 +222,152 @@ class SymbolLinker:
         if region.size == 0:
             return
 
-        if self.detection_mode == "symbol":
-            _, symbols = detect_symbols(region)
-            if not symbols:
-                return
-            min_x = min([s["X"] for s in symbols])
-            min_y = min([s["Y"] for s in symbols])
-            max_x = max([s["X"] + s["Width"] for s in symbols])
-            max_y = max([s["Y"] + s["Height"] for s in symbols])
-
-            symbol = {
-                "rel_x": x1 + min_x,
-                "rel_y": y1 + min_y,
-                "w": max_x - min_x,
-                "h": max_y - min_y
-            }
-            self.current_symbol = symbol
-
-            sx1 = symbol["rel_x"] / self.image_scale + self.image_x_offset
-            sy1 = symbol["rel_y"] / self.image_scale + self.image_y_offset
-            sx2 = (symbol["rel_x"] + symbol["w"]) / self.image_scale + self.image_x_offset
-            sy2 = (symbol["rel_y"] + symbol["h"]) / self.image_scale + self.image_y_offset
-            rect = self.canvas.create_rectangle(sx1, sy1, sx2, sy2, outline="lime", width=2)
-            self.visual_elements.append([rect])
-            self.detection_mode = "text"
-
-        elif self.detection_mode == "text" and self.current_symbol:
-            texts = detect_text(region)
-            if not texts:
-                logging.warning("No text detected in the selected region")
-                self.current_symbol = None
+        if self.detection_mode == "text" and not self.current_symbol:
+            return
+
+        if self.legend_index is not None:
+            with span(f"linker_query_{self.detection_mode}"):
+                results = self.query_index(self.detection_mode, (x1, y1, x2, y2))
+            if len(results):
+                # Drop any slower fallback detection still in flight.
+                self.cancel_detection()
+                self.apply_result(self.detection_mode, results, 0, 0)
                 return
 
-            min_x = min([t["bounding_box"][0] for t in texts])
-            min_y = min([t["bounding_box"][1] for t in texts])
-            max_x = max([t["bounding_box"][2] for t in texts])
-            max_y = max([t["bounding_box"][3] for t in texts])
-
-            combined_text = " ".join(t["text"] for t in texts)
-
-            text = {
-                "text": combined_text,
-                "rel_x": x1 + min_x,
-                "rel_y": y1 + min_y,
-                "w": max_x - min_x,
-                "h": max_y - min_y
-            }
-
-            self.links.append({"symbol": self.current_symbol, "text": text})
-            self.link_table.insert(tk.END, f"🔗 {text['text']}")
-            self.draw_link({"symbol": self.current_symbol, "text": text})
-
-            icon_crop = self.legend_crop[
-                self.current_symbol["rel_y"]:self.current_symbol["rel_y"]+self.current_symbol["h"],
-                self.current_symbol["rel_x"]:self.current_symbol["rel_x"]+self.current_symbol["w"]
-            ]
-            icon_dir = state.config.get("paths", {}).get("icon_dir", "symbol_icons")
-            os.makedirs(icon_dir, exist_ok=True)
-            safe_name = text["text"].strip().replace(" ", "_").replace("/", "-")
-            icon_path = os.path.join(icon_dir, f"{safe_name}.png")
-            cv2.imwrite(icon_path, icon_crop)
+        # Detection runs on the background worker; a newer selection
+        # supersedes this one and its result is then never drawn.
+        self.worker.submit(self.run_detection, self.detection_mode, region, x1, y1)
+        self.set_busy(f"Detecting {self.detection_mode}...")
 
-            self.detection_mode = "symbol"
+    def build_index(self, job, legend):
+        return LegendIndex.build(legend, pool=get_ocr_pool(), cache=self.cache, job=job)
+
+    def query_index(self, mode, bbox):
+        if mode == "symbol":
+            return self.legend_index.query_symbols(bbox)
+        return self.legend_index.query_words(bbox)
+
+    def run_detection(self, job, mode, region, x1, y1):
+        # A newer selection supersedes this one; stop instead of making it
+        # wait behind an outdated detection on the single worker thread.
+        try:
+            with span(f"linker_detect_{mode}", width=region.shape[1], height=region.shape[0]):
+                return self._detect(job, mode, region, x1, y1)
+        except DetectionCancelled:
+            logging.info(f"Detection of the {mode} selection cancelled")
+            return None
+
+    def _detect(self, job, mode, region, x1, y1):
+        if mode == "symbol":
+            _, symbols = detect_symbols(region, pool=get_ocr_pool(), cache=self.cache, as_table=True, job=job)
+            return mode, symbols, x1, y1
+        if job.cancelled:
+            raise DetectionCancelled()
+        texts = WordTable.from_records(detect_text(region, pool=get_ocr_pool(), cache=self.cache))
+        return mode, texts, x1, y1
+
+    def poll_detection(self):
+        if not self.canvas.winfo_exists():
+            self.poll_id = None
+            return
+        for kind, payload in self.index_worker.poll():
+            if kind == "done" and payload is not None:
+                self.legend_index = payload
+            elif kind == "error":
+                logging.warning(f"Legend indexing failed, selections will run detection: {payload}")
+        for kind, payload in self.worker.poll():
+            if kind == "progress":
+                continue
+            self.set_busy(None)
+            if kind == "error":
+                logging.error(f"Detection failed: {payload}")
+                continue
+            self.apply_result(*payload)
+        self.poll_id = self.root.after(50, self.poll_detection)
+
+    def stop_polling(self):
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+
+    def set_busy(self, message):
+        self.status_label.config(text=message or "")
+        self.canvas.config(cursor="watch" if message else "")
+
+    def cancel_detection(self):
+        if self.worker.busy:
+            self.worker.cancel()
+            self.set_busy(None)
+
+    def apply_result(self, mode, results, x1, y1):
+        if mode == "symbol":
+            self.apply_symbol_result(results, x1, y1)
+        elif mode == "text":
+            self.apply_text_result(results, x1, y1)
+
+    def apply_symbol_result(self, symbols, x1, y1):
+        if not len(symbols):
+            return
+        min_x, min_y, max_x, max_y = symbols.bounds()
+
+        symbol = {
+            "rel_x": x1 + min_x,
+            "rel_y": y1 + min_y,
+            "w": max_x - min_x,
+            "h": max_y - min_y
+        }
+        self.current_symbol = symbol
+
+        sx1 = symbol["rel_x"] / self.image_scale + self.image_x_offset
+        sy1 = symbol["rel_y"] / self.image_scale + self.image_y_offset
+        sx2 = (symbol["rel_x"] + symbol["w"]) / self.image_scale + self.image_x_offset
+        sy2 = (symbol["rel_y"] + symbol["h"]) / self.image_scale + self.image_y_offset
+        rect = self.canvas.create_rectangle(sx1, sy1, sx2, sy2, outline="lime", width=2, tags=("overlay",))
+        self.visual_elements.append([rect])
+        self.detection_mode = "text"
+
+    def apply_text_result(self, texts, x1, y1):
+        if not self.current_symbol:
+            return
+        if not len(texts):
+            logging.warning("No text detected in the selected region")
             self.current_symbol = None
+            return
+
+        min_x, min_y, max_x, max_y = texts.bounds()
+        combined_text = " ".join(texts.texts)
+
+        text = {
+            "text": combined_text,
+            "rel_x": x1 + min_x,
+            "rel_y": y1 + min_y,
+            "w": max_x - min_x,
+            "h": max_y - min_y
+        }
+
+        self.links.append({"symbol": self.current_symbol, "text": text})
+        state.record("link", link=self.links[-1])
+        self.link_table.insert(tk.END, f"🔗 {text['text']}")
+        self.draw_link({"symbol": self.current_symbol, "text": text})
+
+        icon_crop = self.legend_crop[
+            self.current_symbol["rel_y"]:self.current_symbol["rel_y"]+self.current_symbol["h"],
+            self.current_symbol["rel_x"]:self.current_symbol["rel_x"]+self.current_symbol["w"]
+        ]
+        icon_dir = state.config.get("paths", {}).get("icon_dir", "symbol_icons")
+        os.makedirs(icon_dir, exist_ok=True)
+        safe_name = text["text"].strip().replace(" ", "_").replace("/", "-")
+        icon_path = os.path.join(icon_dir, f"{safe_name}.png")
+        cv2.imwrite(icon_path, icon_crop)
+
+        self.detection_mode = "symbol"
+        self.current_symbol = None
 
     def clear_last(self):
+        self.cancel_detection()
         if self.links and self.visual_elements:
             self.links.pop()
+            state.record("unlink")
             elements = self.visual_elements.pop()
             for item in elements:
                 self.canvas.delete(item)
@@ -237,10 +375,12 @@ class SymbolLinker:
             self.detection_mode = "symbol"
 
     def clear_all(self):
+        self.cancel_detection()
         self.links.clear()
+        state.record("clear_links")
         self.visual_elements.clear()
         self.link_table.delete(0, tk.END)
-        self.render_image()
+        self.canvas.delete("overlay")
         self.detection_mode = "symbol"
 
     def save_and_continue(self):
@@ -250,21 +390,31 @@ class SymbolLinker:
         try:
             with open(output_path, "w") as f:
                 json.dump(self.links, f, indent=2)
-            state.linked_items = self.links
+            state.linked_items = list(self.links)
+            if state.session is not None:
+                state.session.save(state)
             logging.info(f"Saved symbol-text links to {output_path}")
+            self.stop_polling()
             if self.on_done:
                 self.on_done()
             self.root.quit()
         except Exception as e:
             logging.error(f"Failed to save symbol links: {e}")
 
+    def release_images(self):
+        # Called when the stage is torn down: stop touching its widgets.
+        self.stop_polling()
+        self.worker.cancel()
+        self.index_worker.cancel()
+        if self.legend_key:
+            state.images.release(self.legend_key)
+            self.legend_key = None
+
     def zoom_in(self, event=None):
-        self.zoom_factor *= 1.1
-        self.render_image()
+        self.zoom(1.1)
 
     def zoom_out(self, event=None):
-        self.zoom_factor /= 1.1
-        self.render_image()
+        self.zoom(1 / 1.1)
 
     def set_mode(self, mode):
         self.detection_mode = mode
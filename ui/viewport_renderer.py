@@ -0,0 +1,112 @@
+import tkinter as tk
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+from utils.tile_pyramid import TilePyramid
+from utils.instrumentation import count, traced
+
+
+class ViewportRenderer:
+    """
+    Draw a large image on a canvas by building only the visible tiles.
+
+    Display space is cut into fixed-size tiles at the current scale. render()
+    works out which tiles intersect the visible canvas area, builds the missing
+    ones from a TilePyramid and keeps the resulting PhotoImages in a bounded
+    LRU so panning back, or zooming back to a recent scale, is free. Tiles are
+    tagged "tile" and kept below any overlays on the canvas.
+
+    Args:
+        canvas (tk.Canvas): Target canvas.
+        image (np.ndarray): Full-resolution RGB image.
+        tile_size (int): Tile side in display pixels.
+        max_tiles (int): PhotoImages kept in the LRU, visible ones excluded.
+    """
+
+    def __init__(self, canvas, image, tile_size=256, max_tiles=512):
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.pyramid = TilePyramid(image)
+        self._photos = OrderedDict()
+        self._items = {}
+
+    def set_image(self, image):
+        self.clear()
+        self.pyramid = TilePyramid(image)
+
+    def clear(self):
+        for item in self._items.values():
+            self.canvas.delete(item)
+        self._items.clear()
+        self._photos.clear()
+
+    @traced("render_viewport")
+    def render(self, scale, offset):
+        """
+        Show the visible part of the image.
+
+        Args:
+            scale (float): Display pixels per image pixel.
+            offset (tuple[int, int]): Canvas position of the image's top-left.
+        """
+        ox, oy = offset
+        view_x0 = self.canvas.canvasx(0) - ox
+        view_y0 = self.canvas.canvasy(0) - oy
+        view_x1 = view_x0 + self.canvas.winfo_width()
+        view_y1 = view_y0 + self.canvas.winfo_height()
+
+        full_w, full_h = self.pyramid.size
+        width, height = int(full_w * scale), int(full_h * scale)
+        ts = self.tile_size
+        col0, row0 = max(0, int(view_x0 // ts)), max(0, int(view_y0 // ts))
+        col1 = min((width - 1) // ts, int(view_x1 // ts)) if width else -1
+        row1 = min((height - 1) // ts, int(view_y1 // ts)) if height else -1
+
+        scale_key = round(scale, 6)
+        visible = set()
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                key = (scale_key, col, row)
+                visible.add(key)
+                photo = self._get_tile(key, scale)
+                if photo is None:
+                    continue
+                position = (ox + col * ts, oy + row * ts)
+                item = self._items.get(key)
+                if item is None:
+                    self._items[key] = self.canvas.create_image(*position, anchor=tk.NW, image=photo,
+                                                                tags=("tile",))
+                else:
+                    self.canvas.coords(item, *position)
+
+        for key in [k for k in self._items if k not in visible]:
+            self.canvas.delete(self._items.pop(key))
+        self.canvas.tag_lower("tile")
+        self._evict(visible)
+
+    def _get_tile(self, key, scale):
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+            return photo
+
+        _, col, row = key
+        ts = self.tile_size
+        pixels = self.pyramid.render(scale, col * ts, row * ts, (col + 1) * ts, (row + 1) * ts)
+        if pixels.size == 0:
+            return None
+        photo = ImageTk.PhotoImage(Image.fromarray(pixels))
+        self._photos[key] = photo
+        count("tiles_built")
+        return photo
+
+    def _evict(self, visible):
+        excess = len(self._photos) - self.max_tiles - len(visible)
+        for key in list(self._photos):
+            if excess <= 0:
+                break
+            if key not in visible:
+                del self._photos[key]
+                excess -= 1
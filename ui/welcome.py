@@ -2,9 +2,12 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
 import logging
+import threading
+from PIL import Image, ImageTk
 
 from utils.state_manager import state, WorkflowState
-from utils.pdf_tools import convert_pdf_to_image
+from utils.pdf_tools import import_pdf, RenderCancelled, OVERVIEW_DPI
+from utils.background_worker import BackgroundWorker
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +53,17 @@ class WelcomeScreen(tk.Frame):
         self.status_label = tk.Label(self, text="", bg="white", fg="gray", font=("Arial", 12))
         self.status_label.pack(pady=20)
 
+        # PDF import runs in the background: a low-DPI preview shows up here
+        # first, and the working raster is handed on once it is saved.
+        self.cancel_btn = tk.Button(self, text="Cancel Import", font=("Arial", 12),
+                                    command=self.cancel_import, bg="#a33", fg="white", width=25)
+        self.preview_label = tk.Label(self, bg="white")
+        self.preview_label.pack(pady=10)
+        self.preview_photo = None
+        self.import_worker = BackgroundWorker("pdf-import")
+        self.import_cancel = None
+        self.importing = False
+
 
     def upload_file(self, file_path=None):
         if not file_path:
@@ -58,33 +72,94 @@ class WelcomeScreen(tk.Frame):
                 ("Image Files", "*.png *.jpg *.jpeg"),
                 ("PDF Files", "*.pdf")
             ])
-        if file_path:
+        if file_path and not self.importing:
             self.update_status("Loading file...")
 
             if file_path.lower().endswith(".pdf"):
                 logger.info(f"PDF uploaded: {file_path}")
-                self.update_status("Converting PDF to image...")
-
-                try:
-                    converted = convert_pdf_to_image(file_path)
-                    if not converted:
-                        messagebox.showerror("Conversion Error", "Could not convert PDF to image.")
-                        self.update_status("")
-                        return
-                    file_path = converted
-                    logger.info(f"Converted to image: {file_path}")
-                except Exception as e:
-                    logger.error(f"Failed to convert PDF: {e}")
-                    messagebox.showerror("Error", f"Failed to convert PDF:\n{e}")
-                    self.update_status("")
-                    return
-
-            state.image_path = file_path
-            state.legend_path = None
-            logger.info(f"Image selected: {file_path}")
-            self.update_status("Opening blueprint...")
-            self.destroy()
-            self.on_file_selected(file_path)
+                self.start_pdf_import(file_path)
+                return
+
+            self.open_image(file_path)
+
+    def open_image(self, file_path, source_pdf="", raster_dpi=0):
+        state.image_path = file_path
+        state.legend_path = None
+        state.source_pdf = source_pdf
+        state.raster_dpi = raster_dpi
+        logger.info(f"Image selected: {file_path}")
+        self.update_status("Opening blueprint...")
+        self.destroy()
+        self.on_file_selected(file_path)
+
+    def start_pdf_import(self, pdf_path):
+        # Only an overview is rasterized here; the legend and any other region
+        # that needs detail is re-rendered from the PDF later.
+        dpi = state.config.get("processing", {}).get("overview_dpi", OVERVIEW_DPI)
+        self.importing = True
+        self.import_cancel = threading.Event()
+        for button in (self.test_btn, self.symbol_link_btn, self.upload_btn, self.load_btn):
+            button.config(state=tk.DISABLED)
+        self.cancel_btn.pack(pady=10, before=self.preview_label)
+        self.update_status("Converting PDF to image...")
+        self.import_worker.submit(self.run_import, pdf_path, dpi, self.import_cancel)
+        self.after(50, self.poll_import)
+
+    def run_import(self, job, pdf_path, dpi, cancel_event):
+        image_path, image = import_pdf(
+            pdf_path, dpi=dpi, cancel_event=cancel_event,
+            on_preview=lambda preview: job.report(preview=preview),
+            on_status=lambda message: job.report(message=message)
+        )
+        return pdf_path, dpi, image_path, image
+
+    def poll_import(self):
+        if not self.importing:
+            return
+        for kind, payload in self.import_worker.poll():
+            if kind == "progress":
+                if "preview" in payload:
+                    self.show_preview(payload["preview"])
+                if "message" in payload:
+                    self.update_status(payload["message"])
+            elif kind == "done":
+                pdf_path, dpi, image_path, image = payload
+                logger.info(f"Converted to image: {image_path}")
+                self.finish_import()
+                # Hand the decoded pixels on so the legend selector does not
+                # read the PNG back.
+                state.images.register(image_path, image)
+                self.open_image(image_path, source_pdf=pdf_path, raster_dpi=dpi)
+                return
+            elif kind == "error":
+                self.finish_import()
+                if not isinstance(payload, RenderCancelled):
+                    logger.error(f"Failed to convert PDF: {payload}")
+                    messagebox.showerror("Error", f"Failed to convert PDF:\n{payload}")
+                return
+        self.after(50, self.poll_import)
+
+    def cancel_import(self):
+        if self.importing:
+            logger.info("PDF import cancelled")
+            self.import_cancel.set()
+            self.import_worker.cancel()
+            self.finish_import()
+
+    def finish_import(self):
+        self.importing = False
+        self.cancel_btn.pack_forget()
+        self.preview_label.config(image="")
+        self.preview_photo = None
+        for button in (self.test_btn, self.symbol_link_btn, self.upload_btn, self.load_btn):
+            button.config(state=tk.NORMAL)
+        self.update_status("")
+
+    def show_preview(self, preview):
+        image = Image.fromarray(preview)
+        image.thumbnail((max(1, self.winfo_width() - 40), max(1, self.winfo_height() // 2)))
+        self.preview_photo = ImageTk.PhotoImage(image)
+        self.preview_label.config(image=self.preview_photo)
 
     def open_symbol_linker_test(self):
         from ui.symbol_linker import SymbolLinker  # ensure this is correct
@@ -97,11 +172,12 @@ class WelcomeScreen(tk.Frame):
 
 
     def load_session(self):
-        session_path = filedialog.askopenfilename(filetypes=[("Session Files", "*.json")])
+        session_path = filedialog.askopenfilename(filetypes=[("Session Files", "*.bvs *.json")])
         if session_path and os.path.exists(session_path):
             self.update_status("Loading session...")
             try:
-                loaded_state = WorkflowState.from_json(session_path)
+                # JSON sessions are converted to the binary format on first load.
+                loaded_state = WorkflowState.load_session(session_path)
                 state.__dict__.update(loaded_state.__dict__)
                 logger.info(f"Session loaded from: {session_path}")
                 self.update_status("Opening blueprint...")
@@ -1,9 +1,12 @@
+import os
 import tkinter as tk
 import logging
+import datetime
 from ui.welcome import WelcomeScreen
 from ui.legend_selector import LegendSelector
 from ui.symbol_linker import SymbolLinker
 from utils.state_manager import state
+from utils import instrumentation, logging_setup
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +18,25 @@ class WorkflowManager:
         self.root.title("Blueprint Symbol Manager")
         self.root.attributes("-fullscreen", True)
         self.root.bind("<Escape>", lambda e: self.quit_app())
+        self.root.bind("<F9>", lambda e: self.toggle_instrumentation())
 
         self.container = tk.Frame(self.root)
         self.container.pack(fill=tk.BOTH, expand=True)
 
         self.current_frame = None
+        self.current_stage = None
+        self.stage_span = None
         self.start_welcome()
 
     def clear_frame(self):
+        # Let the outgoing stage drop its references to shared decoded images;
+        # whatever the next stage acquires again is served without decoding.
+        if self.current_stage is not None and hasattr(self.current_stage, "release_images"):
+            self.current_stage.release_images()
+        self.current_stage = None
+        if self.stage_span is not None:
+            self.stage_span.end()
+            self.stage_span = None
         if self.current_frame:
             logger.debug("Clearing current frame")
             self.current_frame.destroy()
@@ -30,33 +44,50 @@ class WorkflowManager:
     def start_welcome(self):
         logger.info("Starting Welcome Screen")
         self.clear_frame()
+        self.stage_span = instrumentation.span("stage:welcome")
         self.current_frame = WelcomeScreen(self.container, on_file_selected=self.start_legend_selector)
 
     def start_legend_selector(self, _=None):
         logger.info(f"Starting Legend Selector for image: {state.image_path}")
         self.clear_frame()
 
+        self.stage_span = instrumentation.span("stage:legend_selector")
+
         # Create a frame container
         frame = tk.Frame(self.container)
         frame.pack(fill=tk.BOTH, expand=True)
 
         # Inject LegendSelector tool into the frame
-        LegendSelector(frame, image_path=state.image_path, on_done=self.start_symbol_linker)
+        self.current_stage = LegendSelector(frame, image_path=state.image_path, on_done=self.start_symbol_linker)
 
         self.current_frame = frame  # This can now be safely destroyed later
 
 
     def start_symbol_linker(self):
         self.clear_frame()
+        self.stage_span = instrumentation.span("stage:symbol_linker")
         self.current_frame = SymbolLinker(
             self.container,
             image_path=state.legend_path,
             on_done=self.end_workflow
         )
+        self.current_stage = self.current_frame
 
     def end_workflow(self):
         logger.info("✅ Symbol linking complete. Ready for next stage.")
 
+    def toggle_instrumentation(self):
+        """F9: start recording timings, or stop and write the summary and a Chrome trace."""
+        if not instrumentation.is_enabled():
+            instrumentation.reset()
+            instrumentation.enable()
+            return
+        instrumentation.log_summary()
+        log_dir = os.path.dirname(logging_setup.LOG_FILE_PATH) if logging_setup.LOG_FILE_PATH else "logs"
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        instrumentation.export_chrome_trace(os.path.join(log_dir, f"trace_{timestamp}.json"))
+        instrumentation.disable()
+
     def quit_app(self):
         logging.info("ESC pressed — exiting application")
         self.root.quit()
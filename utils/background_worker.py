@@ -0,0 +1,100 @@
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Handle passed to a background function to report progress and check for cancellation."""
+
+    def __init__(self, job_id, worker):
+        self.id = job_id
+        self._worker = worker
+
+    @property
+    def cancelled(self):
+        """True once the job was cancelled or superseded by a newer submission."""
+        return self._worker.current_job != self.id
+
+    def report(self, **progress):
+        """Post a progress update; only delivered if the job is still current."""
+        self._worker._results.put((self.id, "progress", progress))
+
+
+class BackgroundWorker:
+    """
+    Runs one job at a time on a daemon thread, keeping Tk's event loop free.
+
+    Results are posted to a queue that the UI drains with poll(), typically
+    from a root.after() loop. Submitting a new job supersedes the previous
+    one: if it has not started it is skipped, and if it is already running its
+    result is dropped, so stale results are never handed back. Long jobs can
+    check job.cancelled to stop early.
+    """
+
+    def __init__(self, name="background-worker"):
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.current_job = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs), superseding any earlier job.
+
+        Returns:
+            int: Id of the new job.
+        """
+        with self._lock:
+            self._next_id += 1
+            self.current_job = self._next_id
+            job = Job(self._next_id, self)
+        self._jobs.put((job, fn, args, kwargs))
+        return job.id
+
+    def cancel(self):
+        """Cancel the current job; its result will not be delivered."""
+        with self._lock:
+            self.current_job = None
+
+    @property
+    def busy(self):
+        return self.current_job is not None
+
+    def poll(self):
+        """
+        Drain finished work for the current job.
+
+        Returns:
+            list[tuple[str, object]]: ("progress", dict), ("done", result) or
+                ("error", exception) events, oldest first.
+        """
+        events = []
+        while True:
+            try:
+                job_id, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                if job_id != self.current_job:
+                    continue
+                if kind != "progress":
+                    self.current_job = None
+            events.append((kind, payload))
+        return events
+
+    def _run(self):
+        while True:
+            job, fn, args, kwargs = self._jobs.get()
+            if job.cancelled:
+                continue
+            try:
+                result = fn(job, *args, **kwargs)
+                self._results.put((job.id, "done", result))
+            except Exception as e:
+                logger.error(f"Background job {job.id} failed: {e}")
+                self._results.put((job.id, "error", e))
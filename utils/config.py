@@ -14,7 +14,9 @@ def get_default_config():
         },
         "processing": {
             "detection_threshold": 0.75,
-            "max_symbols": 200
+            "max_symbols": 200,
+            "overview_dpi": 150,
+            "detail_dpi": 600
         },
         "paths": {
             "temp_dir": "temp",
@@ -0,0 +1,269 @@
+import math
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from utils.image_tools import iter_tiles, expand_tile
+from utils.symbol_matcher import load_symbol_icons, non_max_suppression
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "descriptor_index.npz"
+INDEX_VERSION = 2
+
+# Icons are upscaled to at least this side before feature extraction; legend
+# crops are often too small for ORB to find stable keypoints otherwise.
+MIN_ICON_SIDE = 96
+ICON_PADDING = 16
+
+
+def _icon_mtimes(icon_dir):
+    """Modification time of every icon file in icon_dir, by label."""
+    return {p.stem: str(p.stat().st_mtime) for p in sorted(Path(icon_dir).glob("*.png"))}
+
+
+def create_orb(nfeatures):
+    """ORB detector shared by icons and sheets so their descriptors are comparable."""
+    return cv2.ORB_create(nfeatures=nfeatures, scaleFactor=1.2, nlevels=8, edgeThreshold=15,
+                          patchSize=15, fastThreshold=10)
+
+
+class DescriptorIndex:
+    """
+    ORB keypoint/descriptor index over all legend icons.
+
+    The index is built once from symbol_icons/ and saved next to the icons.
+    Loading is lazy: opening it only reads the version and icon list to check
+    that it is current, and the descriptors are read on the first query. A query
+    extracts features from the sheet tile by tile, matches all of them against
+    the descriptors of every icon in a single LSH search, and lets each match
+    vote for the position of its icon (scale and rotation come from the
+    keypoint sizes and angles). Well-supported votes are verified with a
+    RANSAC similarity transform, which yields the candidate box.
+
+    Args:
+        path (str | Path): Location of the .npz index file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._data = None
+        self._matcher = None
+
+    @classmethod
+    def build(cls, icon_dir="symbol_icons", path=None, features_per_icon=300):
+        """
+        Extract features from every icon in icon_dir and save the index.
+
+        Returns:
+            DescriptorIndex: The freshly built index.
+        """
+        icon_dir = Path(icon_dir)
+        path = Path(path) if path else icon_dir / INDEX_FILE
+        orb = create_orb(features_per_icon)
+        # Every scanned icon goes into the manifest, including the ones skipped
+        # below, so an unindexable icon does not make the index look stale.
+        sources = _icon_mtimes(icon_dir)
+
+        labels, sizes = [], []
+        descriptors, label_ids, offsets, kp_sizes, kp_angles = [], [], [], [], []
+        for label, icon in load_symbol_icons(icon_dir).items():
+            gray = cv2.cvtColor(icon, cv2.COLOR_RGB2GRAY)
+            h, w = gray.shape
+            upscale = max(1.0, MIN_ICON_SIDE / min(h, w))
+            big = cv2.resize(gray, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+            big = cv2.copyMakeBorder(big, ICON_PADDING, ICON_PADDING, ICON_PADDING, ICON_PADDING,
+                                     cv2.BORDER_REPLICATE)
+            keypoints, desc = orb.detectAndCompute(big, None)
+            if desc is None or len(keypoints) < 3:
+                logger.warning(f"Icon '{label}' has too few features to index")
+                continue
+
+            label_id = len(labels)
+            labels.append(label)
+            sizes.append((w, h))
+            pts = np.array([kp.pt for kp in keypoints], dtype=np.float32)
+            # Offsets from the icon centre, in original icon pixels.
+            offsets.append((pts - ICON_PADDING) / upscale - np.array([w / 2, h / 2], dtype=np.float32))
+            kp_sizes.append(np.array([kp.size for kp in keypoints], dtype=np.float32) / upscale)
+            kp_angles.append(np.array([kp.angle for kp in keypoints], dtype=np.float32))
+            descriptors.append(desc)
+            label_ids.append(np.full(len(keypoints), label_id, dtype=np.int32))
+
+        if not labels:
+            raise ValueError(f"No indexable icons found in {icon_dir}")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            version=np.array(INDEX_VERSION),
+            labels=np.array(labels),
+            source_labels=np.array(list(sources), dtype=str),
+            source_mtimes=np.array(list(sources.values()), dtype=str),
+            icon_sizes=np.array(sizes, dtype=np.int32),
+            descriptors=np.concatenate(descriptors),
+            label_ids=np.concatenate(label_ids),
+            offsets=np.concatenate(offsets),
+            kp_sizes=np.concatenate(kp_sizes),
+            kp_angles=np.concatenate(kp_angles)
+        )
+        logger.info(f"Descriptor index for {len(labels)} icons saved to {path}")
+        return cls(path)
+
+    @classmethod
+    def load_or_build(cls, icon_dir="symbol_icons", path=None, **kwargs):
+        """Open the saved index, rebuilding it if icons were added, removed or changed."""
+        icon_dir = Path(icon_dir)
+        path = Path(path) if path else icon_dir / INDEX_FILE
+        if path.exists():
+            index = cls(path)
+            version, sources = index._read_manifest()
+            if version == INDEX_VERSION and sources == _icon_mtimes(icon_dir):
+                return index
+            logger.info("Legend icons changed, rebuilding descriptor index")
+        return cls.build(icon_dir, path, **kwargs)
+
+    def _read_manifest(self):
+        """Index version and the mtimes of the icons it was built from, read without the descriptor arrays."""
+        # Members of an .npz are only decompressed when accessed.
+        with np.load(self.path) as npz:
+            version = int(npz["version"])
+            if version != INDEX_VERSION:
+                return version, None
+            return version, dict(zip(npz["source_labels"].tolist(), npz["source_mtimes"].tolist()))
+
+    def _load(self):
+        if self._data is None:
+            with np.load(self.path) as npz:
+                self._data = {key: npz[key] for key in npz.files}
+        return self._data
+
+    @property
+    def labels(self):
+        return self._load()["labels"].tolist()
+
+    def _get_matcher(self):
+        if self._matcher is None:
+            index_params = dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1)  # FLANN LSH
+            self._matcher = cv2.FlannBasedMatcher(index_params, dict(checks=64))
+            self._matcher.add([self._load()["descriptors"]])
+            self._matcher.train()
+        return self._matcher
+
+    def extract_sheet_features(self, sheet, tile_size=1024, features_per_tile=2000):
+        """
+        ORB features of a whole sheet, detected tile by tile so that dense and
+        sparse areas both get keypoints.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Keypoint
+                positions (N, 2), sizes, angles and descriptors (N, 32).
+        """
+        gray = cv2.cvtColor(sheet, cv2.COLOR_RGB2GRAY) if sheet.ndim == 3 else sheet
+        height, width = gray.shape
+        orb = create_orb(features_per_tile)
+        margin = 32
+
+        pts, sizes, angles, descs = [], [], [], []
+        for y0, x0, y1, x1 in iter_tiles(height, width, tile_size):
+            ey0, ex0, ey1, ex1 = expand_tile(y0, x0, y1, x1, margin, height, width)
+            keypoints, desc = orb.detectAndCompute(gray[ey0:ey1, ex0:ex1], None)
+            if desc is None:
+                continue
+            xy = np.array([kp.pt for kp in keypoints], dtype=np.float32) + (ex0, ey0)
+            # Keep only keypoints owned by this tile's core, not its margin.
+            own = (xy[:, 0] >= x0) & (xy[:, 0] < x1) & (xy[:, 1] >= y0) & (xy[:, 1] < y1)
+            pts.append(xy[own])
+            sizes.append(np.array([kp.size for kp in keypoints], dtype=np.float32)[own])
+            angles.append(np.array([kp.angle for kp in keypoints], dtype=np.float32)[own])
+            descs.append(desc[own])
+
+        if not pts:
+            empty = np.empty(0, dtype=np.float32)
+            return np.empty((0, 2), np.float32), empty, empty, np.empty((0, 32), np.uint8)
+        return np.concatenate(pts), np.concatenate(sizes), np.concatenate(angles), np.concatenate(descs)
+
+    def query(self, sheet, ratio=0.8, min_inliers=6, scale_range=(0.5, 2.0), nms_iou=0.3, **feature_kwargs):
+        """
+        Candidate matches for every indexed legend symbol on a sheet.
+
+        Args:
+            sheet (np.ndarray): RGB or grayscale sheet.
+            ratio (float): Lowe ratio test threshold.
+            min_inliers (int): RANSAC inliers needed to accept a candidate.
+            scale_range (tuple[float, float]): Accepted icon scale factors.
+            nms_iou (float): IoU above which overlapping candidates are merged.
+            **feature_kwargs: Passed to extract_sheet_features.
+
+        Returns:
+            list[dict]: Candidates with "label", "score" (inlier ratio),
+                "inliers", "scale", "angle" (degrees) and "bounding_box".
+        """
+        data = self._load()
+        pts, sizes, angles, descs = self.extract_sheet_features(sheet, **feature_kwargs)
+        if len(descs) == 0:
+            return []
+
+        knn = self._get_matcher().knnMatch(descs, k=2)
+        query_idx, train_idx = [], []
+        for pair in knn:
+            if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance:
+                query_idx.append(pair[0].queryIdx)
+                train_idx.append(pair[0].trainIdx)
+        if not query_idx:
+            return []
+        q = np.array(query_idx)
+        t = np.array(train_idx)
+
+        # Each match predicts where its icon's centre is on the sheet.
+        label_ids = data["label_ids"][t]
+        scale = sizes[q] / data["kp_sizes"][t]
+        theta = np.deg2rad(angles[q] - data["kp_angles"][t])
+        ox, oy = data["offsets"][t, 0], data["offsets"][t, 1]
+        cos, sin = np.cos(theta), np.sin(theta)
+        cx = pts[q, 0] - scale * (cos * ox - sin * oy)
+        cy = pts[q, 1] - scale * (sin * ox + cos * oy)
+
+        valid = (scale >= scale_range[0]) & (scale <= scale_range[1])
+        icon_sizes = data["icon_sizes"].astype(np.float32)
+        cell = np.maximum(icon_sizes[label_ids].max(axis=1) / 2, 8.0)
+        keys = np.stack([label_ids, np.floor(cx / cell), np.floor(cy / cell)], axis=1).astype(np.int64)[valid]
+        match_ids = np.nonzero(valid)[0]
+        if len(keys) == 0:
+            return []
+
+        _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        boxes, scores, candidates = [], [], []
+        for group in np.nonzero(counts >= min_inliers)[0]:
+            members = match_ids[inverse == group]
+            label_id = int(label_ids[members[0]])
+            w, h = data["icon_sizes"][label_id]
+            src = data["offsets"][t[members]] + (w / 2, h / 2)
+            dst = pts[q[members]]
+            transform, inlier_mask = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC,
+                                                                 ransacReprojThreshold=3.0)
+            if transform is None or int(inlier_mask.sum()) < min_inliers:
+                continue
+
+            corners = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float64)
+            mapped = corners @ transform[:, :2].T + transform[:, 2]
+            x1, y1 = np.floor(mapped.min(axis=0)).astype(int)
+            x2, y2 = np.ceil(mapped.max(axis=0)).astype(int)
+            inliers = int(inlier_mask.sum())
+            icon_features = int(np.count_nonzero(data["label_ids"] == label_id))
+            boxes.append((x1, y1, x2, y2))
+            scores.append(inliers / icon_features)
+            candidates.append({
+                "label": str(data["labels"][label_id]),
+                "score": inliers / icon_features,
+                "inliers": inliers,
+                "scale": float(math.hypot(transform[0, 0], transform[1, 0])),
+                "angle": float(math.degrees(math.atan2(transform[1, 0], transform[0, 0]))),
+                "bounding_box": (int(x1), int(y1), int(x2), int(y2))
+            })
+
+        keep = non_max_suppression(np.array(boxes), np.array(scores), nms_iou) if boxes else []
+        return [candidates[i] for i in keep]
@@ -0,0 +1,271 @@
+import numpy as np
+
+
+def _box_array(boxes):
+    return np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+
+def _offsets_from_lengths(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class WordTable:
+    """
+    OCR words as parallel arrays.
+
+    Texts live in one UTF-8 blob indexed by byte offsets, so a table of any
+    size is a handful of arrays rather than one dict per word. Indexing or
+    iterating yields words in the detect_text dict format.
+
+    Args:
+        text_offsets (np.ndarray): (N + 1,) byte offsets into text_blob.
+        text_blob (np.ndarray): uint8 UTF-8 bytes of all texts.
+        confidence (np.ndarray): (N,) Tesseract confidences.
+        boxes (np.ndarray): (N, 4) "bounding_box" values.
+        rel_boxes (np.ndarray | None): (N, 4) "relative_bounding_box" values.
+        has_rel (np.ndarray | None): (N,) which words carry rel_boxes.
+    """
+
+    def __init__(self, text_offsets, text_blob, confidence, boxes, rel_boxes=None, has_rel=None):
+        self.text_offsets = np.asarray(text_offsets, dtype=np.int64)
+        self.text_blob = np.asarray(text_blob, dtype=np.uint8)
+        self.confidence = np.asarray(confidence, dtype=np.int32)
+        self.boxes = _box_array(boxes)
+        n = len(self.boxes)
+        self.rel_boxes = _box_array(rel_boxes) if rel_boxes is not None else np.zeros((n, 4), np.int32)
+        self.has_rel = np.asarray(has_rel, dtype=bool) if has_rel is not None else np.zeros(n, bool)
+
+    @classmethod
+    def from_records(cls, words):
+        encoded = [w["text"].encode("utf-8") for w in words]
+        return cls(
+            _offsets_from_lengths([len(b) for b in encoded]),
+            np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            [w["confidence"] for w in words],
+            [w["bounding_box"] for w in words],
+            [w.get("relative_bounding_box", (0, 0, 0, 0)) for w in words],
+            ["relative_bounding_box" in w for w in words]
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(1, np.int64), np.empty(0, np.uint8), np.empty(0, np.int32), np.empty((0, 4)))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @property
+    def texts(self):
+        data = self.text_blob.tobytes()
+        offsets = self.text_offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or not np.isscalar(index):
+            return self.take(np.arange(len(self))[index])
+        index = int(index) % len(self) if len(self) else int(index)
+        start, stop = self.text_offsets[index], self.text_offsets[index + 1]
+        return self._record(self.text_blob[start:stop].tobytes().decode("utf-8"), index)
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def _record(self, text, i):
+        word = {"text": text, "confidence": int(self.confidence[i]),
+                "bounding_box": tuple(int(v) for v in self.boxes[i])}
+        if self.has_rel[i]:
+            word["relative_bounding_box"] = tuple(int(v) for v in self.rel_boxes[i])
+        return word
+
+    def to_records(self):
+        texts = self.texts
+        confidence = self.confidence.tolist()
+        boxes = self.boxes.tolist()
+        rel = self.rel_boxes.tolist()
+        has_rel = self.has_rel.tolist()
+        words = []
+        for i, text in enumerate(texts):
+            word = {"text": text, "confidence": confidence[i], "bounding_box": tuple(boxes[i])}
+            if has_rel[i]:
+                word["relative_bounding_box"] = tuple(rel[i])
+            words.append(word)
+        return words
+
+    def take(self, indices):
+        """Rows at the given indices (or boolean mask), as a new table."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.nonzero(indices)[0]
+        starts, stops = self.text_offsets[indices], self.text_offsets[indices + 1]
+        lengths = stops - starts
+        if len(indices):
+            # Gather each text's byte range without a Python loop.
+            ranges = np.repeat(starts - _offsets_from_lengths(lengths)[:-1], lengths) + np.arange(lengths.sum())
+            blob = self.text_blob[ranges]
+        else:
+            blob = np.empty(0, np.uint8)
+        return WordTable(_offsets_from_lengths(lengths), blob, self.confidence[indices],
+                         self.boxes[indices], self.rel_boxes[indices], self.has_rel[indices])
+
+    filter = take
+
+    def bounds(self):
+        """Union (x1, y1, x2, y2) of all word boxes, or None if empty."""
+        return _bounds(self.boxes)
+
+    def to_arrays(self, prefix):
+        return {
+            f"{prefix}_text_offsets": self.text_offsets,
+            f"{prefix}_text_blob": self.text_blob,
+            f"{prefix}_confidence": self.confidence,
+            f"{prefix}_boxes": self.boxes,
+            f"{prefix}_has_rel": self.has_rel,
+            f"{prefix}_rel_boxes": self.rel_boxes
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(arrays[f"{prefix}_text_offsets"], arrays[f"{prefix}_text_blob"],
+                   arrays[f"{prefix}_confidence"], arrays[f"{prefix}_boxes"],
+                   arrays[f"{prefix}_rel_boxes"], arrays[f"{prefix}_has_rel"])
+
+
+class DetectionTable:
+    """
+    Detected symbols as a struct of arrays.
+
+    Boxes, ids and scores are NumPy arrays; the words found inside each symbol
+    are stored once in a WordTable and addressed through word_offsets. Filters
+    and geometric queries work on whole columns. Indexing or iterating yields
+    symbols in the dict format detect_symbols has always returned, built only
+    for the rows actually touched.
+
+    Args:
+        boxes (np.ndarray): (N, 4) boxes as (x1, y1, x2, y2).
+        ids (np.ndarray | None): Symbol ids; defaults to 1..N.
+        scores (np.ndarray | None): Per-symbol confidence; defaults to 1.
+        words (WordTable | None): Words of all symbols, grouped by symbol.
+        word_offsets (np.ndarray | None): (N + 1,) row offsets into words.
+    """
+
+    def __init__(self, boxes, ids=None, scores=None, words=None, word_offsets=None):
+        self.boxes = _box_array(boxes)
+        n = len(self.boxes)
+        self.ids = np.asarray(ids, dtype=np.int64) if ids is not None else np.arange(1, n + 1, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float32) if scores is not None else np.ones(n, np.float32)
+        self.words = words if words is not None else WordTable.empty()
+        self.word_offsets = (np.asarray(word_offsets, dtype=np.int64) if word_offsets is not None
+                             else np.zeros(n + 1, np.int64))
+
+    @classmethod
+    def from_boxes(cls, boxes, box_words, scores=None):
+        """
+        Build a table from boxes and, per box, its list of word dicts.
+        """
+        flat = [w for words in box_words for w in words]
+        return cls(boxes, scores=scores, words=WordTable.from_records(flat),
+                   word_offsets=_offsets_from_lengths([len(words) for words in box_words]))
+
+    @classmethod
+    def from_records(cls, symbols):
+        """Build a table from symbols in the detect_symbols dict format."""
+        table = cls.from_boxes([s["BoundingBox"] for s in symbols], [s["Text"] for s in symbols])
+        table.ids = np.array([s["Symbol_ID"] for s in symbols], dtype=np.int64)
+        return table
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or not np.isscalar(index):
+            return self.filter(np.arange(len(self))[index])
+        index = int(index) % len(self) if len(self) else int(index)
+        words = self.words.take(np.arange(self.word_offsets[index], self.word_offsets[index + 1]))
+        return self._record(index, words.to_records())
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def _record(self, i, words):
+        x1, y1, x2, y2 = (int(v) for v in self.boxes[i])
+        return {
+            "Symbol_ID": int(self.ids[i]),
+            "X": x1,
+            "Y": y1,
+            "Width": x2 - x1,
+            "Height": y2 - y1,
+            "BoundingBox": (x1, y1, x2, y2),
+            "Text": words
+        }
+
+    def to_records(self):
+        """All symbols as dicts, as returned by detect_symbols."""
+        words = self.words.to_records()
+        offsets = self.word_offsets.tolist()
+        return [self._record(i, words[offsets[i]:offsets[i + 1]]) for i in range(len(self))]
+
+    def filter(self, mask):
+        """Rows selected by a boolean mask or index array, as a new table."""
+        indices = np.asarray(mask)
+        if indices.dtype == bool:
+            indices = np.nonzero(indices)[0]
+        starts, stops = self.word_offsets[indices], self.word_offsets[indices + 1]
+        lengths = stops - starts
+        word_rows = np.repeat(starts - _offsets_from_lengths(lengths)[:-1], lengths) + np.arange(lengths.sum())
+        return DetectionTable(self.boxes[indices], self.ids[indices], self.scores[indices],
+                              self.words.take(word_rows), _offsets_from_lengths(lengths))
+
+    @property
+    def widths(self):
+        return self.boxes[:, 2] - self.boxes[:, 0]
+
+    @property
+    def heights(self):
+        return self.boxes[:, 3] - self.boxes[:, 1]
+
+    def areas(self):
+        return self.widths.astype(np.int64) * self.heights
+
+    def iou(self, box):
+        """IoU of every symbol box with one (x1, y1, x2, y2) box."""
+        b = self.boxes.astype(np.int64)
+        ix = np.clip(np.minimum(b[:, 2], box[2]) - np.maximum(b[:, 0], box[0]), 0, None)
+        iy = np.clip(np.minimum(b[:, 3], box[3]) - np.maximum(b[:, 1], box[1]), 0, None)
+        inter = ix * iy
+        union = self.areas() + (box[2] - box[0]) * (box[3] - box[1]) - inter
+        return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+    def within(self, box):
+        """Mask of symbols lying entirely inside (x1, y1, x2, y2)."""
+        b = self.boxes
+        return (b[:, 0] >= box[0]) & (b[:, 1] >= box[1]) & (b[:, 2] <= box[2]) & (b[:, 3] <= box[3])
+
+    def bounds(self):
+        """Union (x1, y1, x2, y2) of all symbol boxes, or None if empty."""
+        return _bounds(self.boxes)
+
+    def to_arrays(self, prefix):
+        arrays = self.words.to_arrays(f"{prefix}_word")
+        arrays.update({
+            f"{prefix}_ids": self.ids,
+            f"{prefix}_boxes": self.boxes,
+            f"{prefix}_scores": self.scores,
+            f"{prefix}_word_offsets": self.word_offsets
+        })
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        scores = arrays.get(f"{prefix}_scores")
+        return cls(arrays[f"{prefix}_boxes"], arrays[f"{prefix}_ids"], scores,
+                   WordTable.from_arrays(arrays, f"{prefix}_word"), arrays[f"{prefix}_word_offsets"])
+
+
+def _bounds(boxes):
+    if len(boxes) == 0:
+        return None
+    x1, y1 = boxes[:, :2].min(axis=0).tolist()
+    x2, y2 = boxes[:, 2:].max(axis=0).tolist()
+    return x1, y1, x2, y2
@@ -0,0 +1,172 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("array", "refs", "parent", "nbytes")
+
+    def __init__(self, array, parent=None):
+        self.array = array
+        self.refs = 0
+        self.parent = parent
+        # Views share their parent's buffer, so only owners count against the cap.
+        self.nbytes = 0 if parent is not None else array.nbytes
+
+
+class ImageRegistry:
+    """
+    Decoded images shared between workflow stages.
+
+    Images are keyed by path (or any string). acquire() decodes a file only
+    the first time it is asked for; later stages get the same RGB array back.
+    crop() registers a zero-copy view of an existing image under its own key
+    and keeps the parent alive for as long as the view is registered.
+
+    Entries are reference counted. Once the decoded bytes exceed max_bytes,
+    the least recently used entries nobody holds are evicted.
+
+    Args:
+        max_bytes (int): Memory cap for decoded images.
+    """
+
+    def __init__(self, max_bytes=2 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    def acquire(self, key, loader=None):
+        """
+        Get an image, decoding it on first use, and take a reference to it.
+
+        Args:
+            key (str): Registry key; by default also the image path.
+            loader (Callable[[], np.ndarray] | None): Produces the array on a
+                miss. Defaults to decoding `key` from disk as RGB.
+
+        Returns:
+            np.ndarray: The shared image. Treat it as read-only.
+        """
+        key = str(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                array = loader() if loader else self._decode(key)
+                entry = self._add(key, array)
+            entry.refs += 1
+            self._entries.move_to_end(key)
+            return entry.array
+
+    def register(self, key, array, parent=None):
+        """
+        Add an already decoded array without taking a reference to it.
+
+        Registering over an existing key replaces its array but keeps the
+        references taken on it, so holders still release it once each.
+        """
+        with self._lock:
+            self._add(str(key), array, parent)
+        return array
+
+    def crop(self, key, bbox, crop_key=None):
+        """
+        Register and acquire a zero-copy view of part of an image.
+
+        Args:
+            key (str): Key of the source image, which must be registered.
+            bbox (tuple[int, int, int, int]): (x1, y1, x2, y2) in source pixels.
+            crop_key (str | None): Key for the view; defaults to one derived
+                from the source key and bbox.
+
+        Returns:
+            np.ndarray: View into the source image.
+        """
+        key = str(key)
+        x1, y1, x2, y2 = bbox
+        crop_key = str(crop_key) if crop_key else f"{key}#{x1},{y1},{x2},{y2}"
+        with self._lock:
+            source = self._entries.get(key)
+            if source is None:
+                raise KeyError(f"Image not registered: {key}")
+            height, width = source.array.shape[:2]
+            x1, x2 = max(0, x1), min(width, x2)
+            y1, y2 = max(0, y1), min(height, y2)
+            self._add(crop_key, source.array[y1:y2, x1:x2], parent=key)
+            return self.acquire(crop_key)
+
+    def release(self, key):
+        """Drop a reference taken by acquire() or crop()."""
+        key = str(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            if entry.refs == 0:
+                self._evict()
+
+    def get(self, key):
+        """Return a registered image without taking a reference, or None."""
+        with self._lock:
+            entry = self._entries.get(str(key))
+            return entry.array if entry else None
+
+    def __contains__(self, key):
+        return str(key) in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "held": sum(1 for e in self._entries.values() if e.refs)
+            }
+
+    @staticmethod
+    def _decode(path):
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"Could not read image {path}")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+    def _add(self, key, array, parent=None):
+        refs = 0
+        if key in self._entries:
+            # Callers holding the old array still count: a replaced entry must
+            # not become evictable, or underflow on their release().
+            refs = self._entries[key].refs
+            self._remove(key)
+        if parent is not None:
+            # The view holds a reference so its parent cannot be evicted under it.
+            self._entries[parent].refs += 1
+        entry = _Entry(array, parent)
+        entry.refs = refs
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._evict(keep=key)
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+        if entry.parent is not None and entry.parent in self._entries:
+            self._entries[entry.parent].refs -= 1
+
+    def _evict(self, keep=None):
+        while self._bytes > self.max_bytes:
+            victim = next((k for k, e in self._entries.items() if e.refs == 0 and k != keep), None)
+            if victim is None:
+                logger.warning(f"Image registry over its {self.max_bytes} byte cap, all images in use")
+                return
+            logger.debug(f"Evicting {victim} from image registry")
+            self._remove(victim)
@@ -1,42 +1,358 @@
 import cv2
+import logging
+import threading
 import numpy as np
 import pytesseract
+from collections import deque
 from pytesseract import Output
+from utils.result_cache import make_cache_key
+from utils.detection_table import DetectionTable
+from utils.instrumentation import span, count, traced, memory_snapshot
 
-def preprocess_image(image):
-    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+logger = logging.getLogger(__name__)
+
+# Close (3 iterations) + open (2 iterations) of a 3x3 kernel reach 10 pixels
+# out, so tiles need at least that much context to match the full-image mask.
+MIN_TILE_HALO = 10
+
+OCR_CONFIG = r'--oem 3 --psm 11'
+OCR_MIN_CONFIDENCE = 30
+
+# Text line proposals are packed one above the other into a mosaic for a
+# single Tesseract call; strips are separated by MOSAIC_GAP white pixels and
+# a mosaic is split when it would grow beyond MOSAIC_MAX_HEIGHT.
+MOSAIC_GAP = 16
+MOSAIC_MAX_HEIGHT = 16000
+# Above this share of the image, proposals save nothing over a full pass.
+PROPOSAL_MAX_COVERAGE = 0.6
+# Drawing labels are about a tenth of an inch tall; the proposal geometry is
+# scaled from the expected text height in pixels at the raster's DPI.
+TEXT_HEIGHT_INCHES = 0.1
+DEFAULT_TEXT_HEIGHT = 15  # 0.1 in at 150 DPI
+
+# Bit flags packed into the output buffer while the tiled pass is running.
+_EDGE_CANDIDATE = 1
+_EDGE_STRONG = 2
+_MASK_BIT = 4
+
+# Colour mask bounds: HSV saturation and value of at least 30 (any hue).
+MIN_SATURATION = 30
+MIN_VALUE = 30
+
+# Close x3 then open x2 with a 3x3 kernel is dilate 7x7, erode 7x7, erode 5x5,
+# dilate 5x5; the two erosions compose into a single 11x11 one.
+_CLOSE_DILATE = np.ones((7, 7), np.uint8)
+_CLOSE_OPEN_ERODE = np.ones((11, 11), np.uint8)
+_OPEN_DILATE = np.ones((5, 5), np.uint8)
+
+_sv_lut = None
+_local = threading.local()
+
+class DetectionCancelled(Exception):
+    """Raised when the background job running a detection is cancelled or superseded."""
+
+def _check_cancelled(job):
+    if job is not None and job.cancelled:
+        raise DetectionCancelled()
+
+def _min_chroma_lut():
+    """
+    Per HSV value V, the smallest max-min channel difference whose saturation
+    reaches MIN_SATURATION, or 255 (unreachable) when V < MIN_VALUE.
+
+    Saturation is 255 * (max - min) / max, rounded the way OpenCV rounds it, so
+    the table is read off OpenCV itself: one pixel for every (V, difference)
+    pair, converted with cvtColor.
+    """
+    global _sv_lut
+    if _sv_lut is None:
+        v, d = np.meshgrid(np.arange(256), np.arange(256), indexing="ij")
+        probe = np.stack([v, np.clip(v - d, 0, 255), np.clip(v - d, 0, 255)], axis=-1).astype(np.uint8)
+        sat = cv2.cvtColor(probe, cv2.COLOR_RGB2HSV)[..., 1]
+        ok = (sat >= MIN_SATURATION) & (v >= MIN_VALUE) & (d <= v)
+        _sv_lut = np.where(ok.any(axis=1), ok.argmax(axis=1), 255).astype(np.uint8)
+    return _sv_lut
+
+class PreprocessEngine:
+    """
+    preprocess_image with preallocated, reused work buffers.
+
+    The colour mask is computed from the channel max (HSV value) and max-min
+    difference through a lookup table instead of a full HSV conversion, the
+    three masks are OR-ed in place into one buffer, and the close/open
+    iterations run as three single morphology passes with larger kernels.
+    Results are identical to the step-by-step pipeline.
+
+    Buffers grow to the largest image seen. Images above max_retained_pixels
+    are processed with temporary buffers that are dropped afterwards, so a
+    long-lived engine does not pin the memory of one huge sheet. An engine is
+    not thread-safe; get_preprocess_engine() returns one per thread.
+
+    Args:
+        max_retained_pixels (int): Largest buffer size kept between calls.
+    """
+
+    N_BUFFERS = 6
+
+    def __init__(self, max_retained_pixels=1 << 24):
+        self.max_retained_pixels = max_retained_pixels
+        self._buffers = None
+
+    def _get_buffers(self, height, width):
+        buffers = self._buffers
+        if buffers is None or buffers[0].shape[0] < height or buffers[0].shape[1] < width:
+            if buffers is not None:
+                height, width = max(height, buffers[0].shape[0]), max(width, buffers[0].shape[1])
+            buffers = [np.empty((height, width), np.uint8) for _ in range(self.N_BUFFERS)]
+            if height * width <= self.max_retained_pixels:
+                self._buffers = buffers
+        return buffers
+
+    def release(self):
+        self._buffers = None
+
+    def process(self, image, threshold=None, edges=None, out=None, edges_out=None):
+        """
+        Binary symbol mask of an RGB image.
+
+        Args:
+            image (np.ndarray): RGB image.
+            threshold (int | None): Gray threshold; None uses Otsu on this image.
+            edges (np.ndarray | None): Precomputed 0/255 edge mask; None runs
+                Canny on this image.
+            out (np.ndarray | None): Output array; a new one is allocated if None.
+            edges_out (np.ndarray | None): If given, receives the edge mask.
+
+        Returns:
+            np.ndarray: Binary mask (0/255) with the same height and width as image.
+        """
+        height, width = image.shape[:2]
+        gray, mask, a, b, c, v = (buf[:height, :width] for buf in self._get_buffers(height, width))
+
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY, dst=gray)
+        if threshold is None:
+            _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=mask)
+        else:
+            _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY_INV, dst=mask)
+
+        # Colour mask: S >= 30 and V >= 30  <=>  max - min >= lut[max].
+        a = cv2.extractChannel(image, 0, dst=a)
+        b = cv2.extractChannel(image, 1, dst=b)
+        c = cv2.extractChannel(image, 2, dst=c)
+        v = cv2.max(a, b, dst=v)
+        v = cv2.max(v, c, dst=v)
+        a = cv2.min(a, b, dst=a)
+        a = cv2.min(a, c, dst=a)
+        a = cv2.subtract(v, a, dst=a)
+        b = cv2.LUT(v, _min_chroma_lut(), dst=b)
+        c = cv2.compare(a, b, cv2.CMP_GE, dst=c)
+        mask = cv2.bitwise_or(mask, c, dst=mask)
+
+        if edges is None:
+            edges = cv2.Canny(gray, 50, 150, edges=a)
+        mask = cv2.bitwise_or(mask, edges, dst=mask)
+        if edges_out is not None:
+            edges_out[...] = edges
+
+        a = cv2.dilate(mask, _CLOSE_DILATE, dst=a)
+        b = cv2.erode(a, _CLOSE_OPEN_ERODE, dst=b)
+        if out is None:
+            out = np.empty((height, width), np.uint8)
+        return cv2.dilate(b, _OPEN_DILATE, dst=out)
+
+def get_preprocess_engine():
+    """The calling thread's PreprocessEngine."""
+    engine = getattr(_local, "engine", None)
+    if engine is None:
+        engine = _local.engine = PreprocessEngine()
+    return engine
+
+@traced("preprocess_image")
+def preprocess_image(image, tile_size=None, halo=16, edges_out=None, job=None):
+    if tile_size:
+        return preprocess_image_tiled(image, tile_size=tile_size, halo=halo, edges_out=edges_out, job=job)
+    return get_preprocess_engine().process(image, edges_out=edges_out)
+
+def preprocess_image_tiled(image, tile_size=1024, halo=16, edges_out=None, job=None):
+    """
+    Tiled equivalent of preprocess_image with memory bounded by the tile size.
+
+    The full-size output mask doubles as scratch space for the Canny edge bits,
+    so apart from it only one tile (plus halo) of intermediates is alive at a
+    time. The Otsu threshold is computed from a histogram accumulated over all
+    tiles and Canny hysteresis is propagated across tile seams, so the result is
+    identical to preprocess_image(image).
+
+    Args:
+        image (np.ndarray): RGB image.
+        tile_size (int): Side length of the square tiles, in pixels.
+        halo (int): Context added around each tile for morphology.
+        edges_out (np.ndarray | None): If given, receives the Canny edge mask.
+        job (Job | None): Background job; DetectionCancelled is raised between
+            tiles once it is cancelled.
 
-    _, binary_thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    lower_color = np.array([0, 30, 30])
-    upper_color = np.array([180, 255, 255])
-    color_mask = cv2.inRange(hsv, lower_color, upper_color)
-    edges = cv2.Canny(gray, 50, 150)
+    Returns:
+        np.ndarray: Binary mask (0/255) with the same height and width as image.
+    """
+    if tile_size <= 0:
+        raise ValueError(f"tile_size must be positive, got {tile_size}")
+    if halo < MIN_TILE_HALO:
+        raise ValueError(f"halo must be at least {MIN_TILE_HALO} pixels, got {halo}")
 
-    combined_mask = cv2.bitwise_or(binary_thresh, color_mask)
-    combined_mask = cv2.bitwise_or(combined_mask, edges)
+    height, width = image.shape[:2]
+    out = np.zeros((height, width), np.uint8)
+    tiles = list(iter_tiles(height, width, tile_size))
 
-    kernel = np.ones((3, 3), np.uint8)
-    cleaned_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_CLOSE, kernel, iterations=3)
-    cleaned_mask = cv2.morphologyEx(cleaned_mask, cv2.MORPH_OPEN, kernel, iterations=2)
+    # Pass 1: global gray histogram and per-pixel Canny edge candidates.
+    # Sobel + non-maximum suppression only look 2 pixels out.
+    hist = np.zeros(256, np.int64)
+    for y0, x0, y1, x1 in tiles:
+        _check_cancelled(job)
+        ey0, ex0, ey1, ex1 = expand_tile(y0, x0, y1, x1, 2, height, width)
+        gray = cv2.cvtColor(image[ey0:ey1, ex0:ex1], cv2.COLOR_RGB2GRAY)
+        core = (slice(y0 - ey0, y1 - ey0), slice(x0 - ex0, x1 - ex0))
+        hist += cv2.calcHist([gray[core]], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+        candidates = cv2.Canny(gray, 50, 50)[core]
+        strong = cv2.Canny(gray, 150, 150)[core]
+        out[y0:y1, x0:x1] = (candidates & _EDGE_CANDIDATE) | (strong & _EDGE_STRONG)
 
-    return cleaned_mask
+    threshold = _otsu_threshold(hist)
+    _propagate_edges(out, tiles, tile_size)
+
+    # Pass 2: combine masks and run morphology on each tile with its halo.
+    engine = get_preprocess_engine()
+    for y0, x0, y1, x1 in tiles:
+        _check_cancelled(job)
+        ey0, ex0, ey1, ex1 = expand_tile(y0, x0, y1, x1, halo, height, width)
+        edges = cv2.compare(cv2.bitwise_and(out[ey0:ey1, ex0:ex1], _EDGE_STRONG), 0, cv2.CMP_GT)
+        cleaned_mask = engine.process(image[ey0:ey1, ex0:ex1], threshold=threshold, edges=edges)
+
+        core = cleaned_mask[y0 - ey0:y1 - ey0, x0 - ex0:x1 - ex0]
+        out[y0:y1, x0:x1] |= core & _MASK_BIT
+        if edges_out is not None:
+            edges_out[y0:y1, x0:x1] = edges[y0 - ey0:y1 - ey0, x0 - ex0:x1 - ex0]
+
+    # Pass 3: replace the scratch bits with the final 0/255 mask.
+    for y0, x0, y1, x1 in tiles:
+        view = out[y0:y1, x0:x1]
+        np.bitwise_and(view, _MASK_BIT, out=view)
+        np.right_shift(view, 2, out=view)
+        np.multiply(view, 255, out=view)
+
+    return out
+
+def iter_tiles(height, width, tile_size):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, x0, min(y0 + tile_size, height), min(x0 + tile_size, width)
+
+def expand_tile(y0, x0, y1, x1, margin, height, width):
+    return max(y0 - margin, 0), max(x0 - margin, 0), min(y1 + margin, height), min(x1 + margin, width)
+
+def _otsu_threshold(hist):
+    """Otsu threshold from a 256-bin histogram, mirroring OpenCV's THRESH_OTSU."""
+    eps = float(np.finfo(np.float32).eps)
+    scale = 1.0 / int(hist.sum())
+    mu = sum(i * float(hist[i]) for i in range(256)) * scale
+
+    mu1 = q1 = max_sigma = 0.0
+    max_val = 0
+    for i in range(256):
+        p_i = int(hist[i]) * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+        if min(q1, q2) < eps or max(q1, q2) > 1.0 - eps:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) * (mu1 - mu2)
+        if sigma > max_sigma:
+            max_sigma = sigma
+            max_val = i
+    return max_val
+
+def _propagate_edges(buffer, tiles, tile_size):
+    """
+    Canny hysteresis over the packed edge bits: every 8-connected run of
+    candidates that touches a strong edge becomes strong. Tiles are revisited
+    until no strong edge crosses a seam any more.
+    """
+    height, width = buffer.shape
+    index = {(y0, x0): i for i, (y0, x0, _, _) in enumerate(tiles)}
+
+    pending = deque(range(len(tiles)))
+    queued = set(pending)
+    while pending:
+        i = pending.popleft()
+        queued.discard(i)
+        y0, x0, y1, x1 = tiles[i]
+        ey0, ex0, ey1, ex1 = expand_tile(y0, x0, y1, x1, 1, height, width)
+        region = buffer[ey0:ey1, ex0:ex1]
+
+        strong = (region & _EDGE_STRONG) > 0
+        if not strong.any():
+            continue
+        n_labels, labels = cv2.connectedComponents(region & _EDGE_CANDIDATE, connectivity=8)
+        keep = np.zeros(n_labels, bool)
+        keep[labels[strong]] = True
+        keep[0] = False
+        grown = keep[labels] & ~strong
+        if not grown.any():
+            continue
+        region[grown] |= _EDGE_STRONG
+
+        for dy in (-tile_size, 0, tile_size):
+            for dx in (-tile_size, 0, tile_size):
+                j = index.get((y0 + dy, x0 + dx))
+                if j is not None and j != i and j not in queued:
+                    pending.append(j)
+                    queued.add(j)
+
+def detect_text(image, timeout=0, pool=None, cache=None, proposals=False, text_height=DEFAULT_TEXT_HEIGHT):
+    """
+    OCR an RGB image into words with "text", "confidence" and "bounding_box".
+
+    With proposals=True, Tesseract only sees the lines found by
+    propose_text_regions, packed into one mosaic, and the words are mapped
+    back to image coordinates. Images that are mostly text get a full pass.
+    text_height is the expected label height in pixels used for the proposals;
+    pass text_height_at(dpi) for the raster's resolution.
+    """
+    if cache is not None:
+        params = {"proposals": True, "text_height": text_height} if proposals else {}
+        key = make_cache_key("detect_text", image, config=OCR_CONFIG, min_conf=OCR_MIN_CONFIDENCE, **params)
+        text_data = cache.get(key)
+        if text_data is None:
+            text_data = detect_text(image, timeout=timeout, pool=pool, proposals=proposals, text_height=text_height)
+            cache.put(key, text_data)
+        else:
+            count("ocr_cache_hits")
+        return text_data
+
+    if proposals:
+        return _detect_text_in_proposals(image, timeout=timeout, pool=pool, text_height=text_height)
+
+    count("ocr_calls")
+    if pool is not None:
+        with span("ocr", pixels=image.shape[0] * image.shape[1], pool=True):
+            return pool.run(image)
 
-def detect_text(image):
     gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
     blur = cv2.GaussianBlur(gray, (3, 3), 0)
 
     thresh = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                    cv2.THRESH_BINARY_INV, 11, 2)
 
-    config = r'--oem 3 --psm 11'
-    ocr_result = pytesseract.image_to_data(thresh, lang=None, config=config, output_type=Output.DICT)
+    with span("ocr", pixels=image.shape[0] * image.shape[1]):
+        ocr_result = pytesseract.image_to_data(thresh, lang=None, config=OCR_CONFIG, output_type=Output.DICT,
+                                               timeout=timeout)
 
     text_data = []
     for i in range(len(ocr_result['text'])):
         text = ocr_result['text'][i].strip()
         conf = int(ocr_result['conf'][i])
-        if text and conf > 30 and len(text) > 0:
+        if text and conf > OCR_MIN_CONFIDENCE and len(text) > 0:
             x, y, w, h = (
                 ocr_result['left'][i],
                 ocr_result['top'][i],
@@ -52,63 +368,573 @@ def detect_text(image):
     text_data.sort(key=lambda item: (item["bounding_box"][1] // 10, item["bounding_box"][0]))
     return text_data
 
-def detect_symbols(image, min_area=50, max_area=None, visualize=False):
-    mask = preprocess_image(image)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+def text_height_at(dpi):
+    """Expected label height in pixels for a raster at dpi."""
+    return max(4, int(round(dpi * TEXT_HEIGHT_INCHES)))
+
+@traced("propose_text_regions")
+def propose_text_regions(image, text_height=DEFAULT_TEXT_HEIGHT, min_height=None, max_height=None, gap=None,
+                         rule_length=None, padding=None):
+    """
+    Boxes of likely text lines, from cheap OpenCV primitives only.
+
+    The morphological gradient highlights character strokes. Straight runs
+    longer than rule_length (grid lines, walls, leaders) are opened out of it
+    so labels touching them stay separate; after Otsu and a horizontal close,
+    characters of a word or line fuse into one component.
+    Components are kept when their size and gradient fill look like text and
+    their strokes, measured with a distance transform of the ink, are thin
+    relative to the line height and of even width. Solid fills, thick walls
+    and long rules fail those checks.
+
+    All sizes default to multiples of text_height, so the same proposals
+    come out of a sheet at any DPI as long as text_height follows it (see
+    text_height_at). Letter stems are about one text height long, short of
+    rule_length; max_height leaves room for labels fused with a small symbol
+    or leader they touch.
+
+    Args:
+        image (np.ndarray): RGB image.
+        text_height (int): Expected label height in pixels.
+        min_height (int | None): Smallest line height in pixels.
+        max_height (int | None): Largest line height in pixels.
+        gap (int | None): Horizontal gap, in pixels, bridged between characters.
+        rule_length (int | None): Straight edge runs this long are treated as linework.
+        padding (int | None): Margin added around each returned box.
+
+    Returns:
+        list[tuple]: Line boxes as (x1, y1, x2, y2), sorted by (y1, x1).
+    """
+    height, width = image.shape[:2]
+    min_height = min_height or max(3, round(text_height * 0.4))
+    max_height = max_height or max(min_height, text_height * 10)
+    gap = gap or max(3, round(text_height * 0.6))
+    rule_length = rule_length or max(10, text_height * 2)
+    padding = padding if padding is not None else max(2, text_height // 5)
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    rules = cv2.bitwise_or(
+        cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (rule_length, 1))),
+        cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, rule_length)))
+    )
+    edges = cv2.subtract(edges, cv2.dilate(rules, _CROSS))
+    joined = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (gap, 1)))
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    n, _, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    x, y, w, h, area = (stats[1:, i] for i in range(5))
+    fill = area / np.maximum(w * h, 1)
+    candidates = np.nonzero((h >= min_height) & (h <= max_height) & (w >= h * 0.3) &
+                            (fill > 0.1) & (fill < 0.95))[0]
 
     boxes = []
-    for cnt in contours:
-        x, y, w, h = cv2.boundingRect(cnt)
-        area = w * h
-        if min_area < area and (max_area is None or area < max_area):
-            boxes.append((x, y, x + w, y + h))
+    for i in candidates:
+        x1, y1, bw, bh = int(x[i]), int(y[i]), int(w[i]), int(h[i])
+        strokes = cv2.copyMakeBorder(ink[y1:y1 + bh, x1:x1 + bw], 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        dist = cv2.distanceTransform(strokes, cv2.DIST_L2, 3)[strokes > 0]
+        if not len(dist):
+            continue
+        # Twice the mean distance to the background approximates the stroke width.
+        stroke = 2 * float(dist.mean())
+        if stroke > 0.35 * bh or float(dist.std()) > float(dist.mean()):
+            continue
+        boxes.append((max(0, x1 - padding), max(0, y1 - padding),
+                      min(width, x1 + bw + padding), min(height, y1 + bh + padding)))
+    count("text_proposals", len(boxes))
+    return sorted(boxes, key=lambda b: (b[1], b[0]))
 
-    boxes = sorted(boxes, key=lambda b: (b[1], b[0]))
+def _pack_mosaics(image, boxes):
+    """
+    Stack the crops of boxes vertically on white mosaics.
 
-    merged_boxes = []
+    Returns:
+        list[tuple[np.ndarray, np.ndarray]]: Each mosaic with its strips as
+            rows of (mosaic_y, x1, y1, x2, y2).
+    """
+    mosaics, group, top = [], [], 0
     for box in boxes:
-        added = False
-        for i in range(len(merged_boxes)):
-            x1, y1, x2, y2 = merged_boxes[i]
-            bx1, by1, bx2, by2 = box
-            if abs(y1 - by1) < 20 and abs(x1 - bx1) < 20:
-                nx1, ny1 = min(x1, bx1), min(y1, by1)
-                nx2, ny2 = max(x2, bx2), max(y2, by2)
-                merged_boxes[i] = (nx1, ny1, nx2, ny2)
-                added = True
-                break
-        if not added:
-            merged_boxes.append(box)
-
-    symbol_data = []
-    for i, (x1, y1, x2, y2) in enumerate(merged_boxes):
-        roi = image[y1:y2, x1:x2]
-        text_results = detect_text(roi)
-        for t in text_results:
-            t['relative_bounding_box'] = (
-                x1 + t['bounding_box'][0],
-                y1 + t['bounding_box'][1],
-                x1 + t['bounding_box'][2],
-                y1 + t['bounding_box'][3]
-            )
+        strip_height = box[3] - box[1] + MOSAIC_GAP
+        if group and top + strip_height > MOSAIC_MAX_HEIGHT:
+            mosaics.append(group)
+            group, top = [], 0
+        group.append((top + MOSAIC_GAP, *box))
+        top += strip_height
+    if group:
+        mosaics.append(group)
+
+    packed = []
+    for group in mosaics:
+        strips = np.array(group, dtype=np.int64)
+        heights = strips[:, 4] - strips[:, 2]
+        mosaic = np.full((int(strips[-1, 0] + heights[-1] + MOSAIC_GAP),
+                          int((strips[:, 3] - strips[:, 1]).max() + 2 * MOSAIC_GAP), 3), 255, np.uint8)
+        for top, x1, y1, x2, y2 in group:
+            mosaic[top:top + y2 - y1, MOSAIC_GAP:MOSAIC_GAP + x2 - x1] = image[y1:y2, x1:x2]
+        packed.append((mosaic, strips))
+    return packed
 
-        symbol = {
-            "Symbol_ID": i + 1,
-            "X": x1,
-            "Y": y1,
-            "Width": x2 - x1,
-            "Height": y2 - y1,
-            "BoundingBox": (x1, y1, x2, y2),
-            "Text": text_results
-        }
-        symbol_data.append(symbol)
+def _detect_text_in_proposals(image, timeout=0, pool=None, text_height=DEFAULT_TEXT_HEIGHT):
+    """detect_text restricted to proposed text lines, OCRed as one mosaic."""
+    boxes = propose_text_regions(image, text_height=text_height)
+    if not boxes:
+        return []
+    covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    if covered > PROPOSAL_MAX_COVERAGE * image.shape[0] * image.shape[1]:
+        return detect_text(image, timeout=timeout, pool=pool)
+
+    text_data = []
+    for mosaic, strips in _pack_mosaics(image, boxes):
+        bottoms = strips[:, 0] + (strips[:, 4] - strips[:, 2])
+        for word in detect_text(mosaic, timeout=timeout, pool=pool):
+            mx1, my1, mx2, my2 = word["bounding_box"]
+            # The strip holding the word's centre; words in a gap are dropped.
+            cy = (my1 + my2) // 2
+            row = int(np.searchsorted(strips[:, 0], cy, side="right")) - 1
+            if row < 0 or cy >= bottoms[row]:
+                continue
+            top, x1, y1, x2, y2 = (int(v) for v in strips[row])
+            dx, dy = x1 - MOSAIC_GAP, y1 - top
+            word["bounding_box"] = (max(x1, mx1 + dx), max(y1, my1 + dy), min(x2, mx2 + dx), min(y2, my2 + dy))
+            text_data.append(word)
+
+    text_data.sort(key=lambda item: (item["bounding_box"][1] // 10, item["bounding_box"][0]))
+    return text_data
 
+def _pool_results(pool, images):
+    """
+    OCR results of images from the pool, in order. A job that fails or times
+    out yields None instead of ending the batch.
+    """
+    futures = [pool.submit(image) for image in images]
+    for future in futures:
+        try:
+            yield future.result(timeout=pool.result_timeout())
+        except Exception as e:
+            future.cancel()
+            logger.warning(f"OCR job failed, no text for its region: {type(e).__name__}: {e}")
+            yield None
+
+def _detect_text_batch(rois, pool=None, cache=None, proposals=False, text_height=DEFAULT_TEXT_HEIGHT, job=None):
+    """
+    detect_text over many ROIs, serving cache hits and sending misses to the
+    pool. A pool job that fails or times out gives its ROI no words (and is
+    not cached) while the rest of the batch completes.
+    """
+    rois = list(rois)
+    results = [None] * len(rois)
+    keys = [None] * len(rois)
+    if cache is not None:
+        params = {"proposals": True, "text_height": text_height} if proposals else {}
+        for i, roi in enumerate(rois):
+            keys[i] = make_cache_key("detect_text", roi, config=OCR_CONFIG, min_conf=OCR_MIN_CONFIDENCE, **params)
+            results[i] = cache.get(keys[i])
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    count("ocr_cache_hits", len(rois) - len(missing))
+    if proposals:
+        # Proposals and packing run here; each mosaic goes to the pool.
+        computed = (detect_text(rois[i], pool=pool, proposals=True, text_height=text_height) for i in missing)
+    elif pool is not None:
+        count("ocr_calls", len(missing))
+        computed = _pool_results(pool, (rois[i] for i in missing))
+    else:
+        computed = (detect_text(rois[i]) for i in missing)
+
+    for i, text_data in zip(missing, computed):
+        _check_cancelled(job)
+        if text_data is None:
+            results[i] = []
+            continue
+        if cache is not None:
+            cache.put(keys[i], text_data)
+        results[i] = text_data
+    return results
+
+@traced("detect_text_blocks")
+def detect_text_blocks(image, block_size=None, overlap=256, pool=None, cache=None, proposals=False,
+                       text_height=DEFAULT_TEXT_HEIGHT):
+    """
+    OCR a whole page in a single pass, or in a few large overlapping blocks.
+
+    A word seen by two blocks is kept only by the block whose core (the block
+    without its overlap) contains the word's centre.
+
+    Args:
+        image (np.ndarray): RGB page image.
+        block_size (int | None): Side length of the blocks, or None for one pass
+            over the whole page.
+        overlap (int): Context added around each block so that words on a block
+            boundary are read whole by at least one block.
+        pool (OCRPool | None): Worker pool to OCR the blocks in parallel.
+        cache (ResultCache | None): Cache for per-block OCR results.
+        proposals (bool): OCR only proposed text lines (see detect_text).
+        text_height (int): Expected label height in pixels for the proposals.
+
+    Returns:
+        list[dict]: Words in detect_text format, in page coordinates.
+    """
+    height, width = image.shape[:2]
+    if not block_size or (block_size >= height and block_size >= width):
+        return detect_text(image, pool=pool, cache=cache, proposals=proposals, text_height=text_height)
+
+    blocks = []
+    for y0, x0, y1, x1 in iter_tiles(height, width, block_size):
+        ey0, ex0, ey1, ex1 = expand_tile(y0, x0, y1, x1, overlap, height, width)
+        blocks.append(((y0, x0, y1, x1), (ey0, ex0), image[ey0:ey1, ex0:ex1]))
+
+    block_texts = _detect_text_batch((roi for _, _, roi in blocks), pool=pool, cache=cache,
+                                     proposals=proposals, text_height=text_height)
+
+    text_data = []
+    for ((y0, x0, y1, x1), (ey0, ex0), _), texts in zip(blocks, block_texts):
+        for t in texts:
+            bx1, by1, bx2, by2 = t["bounding_box"]
+            cx, cy = ex0 + (bx1 + bx2) // 2, ey0 + (by1 + by2) // 2
+            if x0 <= cx < x1 and y0 <= cy < y1:
+                t["bounding_box"] = (ex0 + bx1, ey0 + by1, ex0 + bx2, ey0 + by2)
+                text_data.append(t)
+
+    text_data.sort(key=lambda item: (item["bounding_box"][1] // 10, item["bounding_box"][0]))
+    return text_data
+
+@traced("assign_text_to_boxes")
+def assign_text_to_boxes(text_data, boxes):
+    """
+    Assign page-level words to every box that fully contains them.
+
+    Args:
+        text_data (list[dict]): Words in page coordinates, as returned by
+            detect_text_blocks.
+        boxes (list[tuple]): Boxes as (x1, y1, x2, y2).
+
+    Returns:
+        list[list[dict]]: For each box, its words in the per-box detect_text
+            format: "bounding_box" relative to the box and
+            "relative_bounding_box" in page coordinates.
+    """
+    assigned = [[] for _ in boxes]
+    if not text_data or not boxes:
+        return assigned
+
+    words = np.array([t["bounding_box"] for t in text_data], dtype=np.int64)
+    rects = np.array(boxes, dtype=np.int64)
+    chunk = max(1, (1 << 22) // len(rects))
+    for start in range(0, len(words), chunk):
+        w = words[start:start + chunk, None, :]
+        inside = ((rects[None, :, 0] <= w[..., 0]) & (rects[None, :, 1] <= w[..., 1]) &
+                  (w[..., 2] <= rects[None, :, 2]) & (w[..., 3] <= rects[None, :, 3]))
+        for word_idx, box_idx in zip(*np.nonzero(inside)):
+            t = text_data[start + word_idx]
+            x1, y1 = boxes[box_idx][0], boxes[box_idx][1]
+            px1, py1, px2, py2 = t["bounding_box"]
+            assigned[box_idx].append({
+                "text": t["text"],
+                "confidence": t["confidence"],
+                "bounding_box": (px1 - x1, py1 - y1, px2 - x1, py2 - y1),
+                "relative_bounding_box": (px1, py1, px2, py2)
+            })
+
+    for texts in assigned:
+        texts.sort(key=lambda item: (item["bounding_box"][1] // 10, item["bounding_box"][0]))
+    return assigned
+
+@traced("merge_boxes")
+def merge_boxes(boxes, tolerance=(20, 20)):
+    """
+    Greedily merge boxes into clusters anchored at their top-left corner.
+
+    Boxes are taken in (y1, x1) order. Each one joins the earliest cluster
+    whose union box has its top-left corner within tolerance of the box's
+    own corner, otherwise it starts a new cluster. A cluster only grows
+    while new corners stay near its anchor, so evenly spaced boxes never
+    chain into one sheet-sized box.
+
+    Cluster corners are bucketed into a grid with one cell per tolerance, so
+    each box is only compared against the clusters in the 3x3 neighbouring
+    cells instead of every cluster. The fixed processing order makes the
+    result independent of the order the boxes arrive in.
+
+    Args:
+        boxes (list[tuple]): Boxes as (x1, y1, x2, y2).
+        tolerance (tuple[int, int]): Maximum (dx, dy) between a box's corner
+            and a cluster's corner, exclusive.
+
+    Returns:
+        list[tuple]: Union box of each cluster, sorted by (y1, x1).
+    """
+    tol_x, tol_y = tolerance
+    boxes = sorted(boxes, key=lambda b: (b[1], b[0], b[3], b[2]))
+    if tol_x <= 0 or tol_y <= 0:
+        return boxes
+
+    clusters = []
+    grid = {}
+    for box in boxes:
+        x1, y1, x2, y2 = box
+        cx, cy = x1 // tol_x, y1 // tol_y
+        match = None
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for k in grid.get((gx, gy), ()):
+                    ux1, uy1 = clusters[k][0], clusters[k][1]
+                    if abs(ux1 - x1) < tol_x and abs(uy1 - y1) < tol_y and (match is None or k < match):
+                        match = k
+        if match is None:
+            grid.setdefault((cx, cy), []).append(len(clusters))
+            clusters.append(box)
+            continue
+
+        ux1, uy1, ux2, uy2 = clusters[match]
+        merged = (min(ux1, x1), min(uy1, y1), max(ux2, x2), max(uy2, y2))
+        old_cell, new_cell = (ux1 // tol_x, uy1 // tol_y), (merged[0] // tol_x, merged[1] // tol_y)
+        if old_cell != new_cell:
+            grid[old_cell].remove(match)
+            grid.setdefault(new_cell, []).append(match)
+        clusters[match] = merged
+
+    return sorted(clusters, key=lambda b: (b[1], b[0], b[3], b[2]))
+
+_CROSS = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+# Contour tracing costs about as much per shape as component labelling costs
+# for this many pixels; extract_boxes switches method around that ratio.
+_PIXELS_PER_CONTOUR = 200
+
+@traced("extract_boxes")
+def extract_boxes(mask, min_area=50, max_area=None, method="auto"):
+    """
+    Bounding boxes of the outermost shapes of a binary mask.
+
+    Same result as cv2.findContours(RETR_EXTERNAL) followed by boundingRect
+    and the area filter, without a Python loop over the contours: the boxes
+    come out as arrays and are filtered and sorted with NumPy.
+
+    Two methods give identical boxes. "contours" traces the outer contours
+    and reduces their points per contour; it is fastest on typical sheets with
+    a few thousand shapes. "components" labels connected components and reads
+    their stats in one call, whatever the number of shapes, which wins on
+    cluttered masks with 100k+ specks. "auto" picks one from a sampled
+    estimate of the shape count.
+
+    Args:
+        mask (np.ndarray): Binary mask (0/255).
+        min_area (int): Boxes need a width * height above this.
+        max_area (int | None): Boxes need a width * height below this.
+        method (str): "auto", "contours" or "components".
+
+    Returns:
+        np.ndarray: (N, 4) int32 boxes as (x1, y1, x2, y2), sorted by (y1, x1).
+    """
+    if method == "auto":
+        many = _estimate_shape_count(mask) * _PIXELS_PER_CONTOUR > mask.size
+        method = "components" if many else "contours"
+    if method == "contours":
+        x, y, w, h = _contour_rects(mask)
+    elif method == "components":
+        x, y, w, h = _component_rects(mask)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    count("contours_found", len(x))
+
+    area = w * h
+    keep = area > min_area
+    if max_area is not None:
+        keep &= area < max_area
+    x, y, w, h = x[keep], y[keep], w[keep], h[keep]
+    order = np.lexsort((x, y))
+    return np.stack([x, y, x + w, y + h], axis=1)[order].astype(np.int32)
+
+def _estimate_shape_count(mask, step=7):
+    """Foreground runs starting below background, counted on every step-th row."""
+    rows, above = mask[1::step], mask[0:-1:step]
+    return step * int(np.count_nonzero(rows[:, 1:] > (rows[:, :-1] | above[:, 1:])))
+
+def _contour_rects(mask):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return (np.empty(0, np.int64),) * 4
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    starts = np.zeros(len(contours), np.int64)
+    np.cumsum(np.fromiter(map(len, contours), np.int64, len(contours))[:-1], out=starts[1:])
+    low = np.minimum.reduceat(points, starts)
+    high = np.maximum.reduceat(points, starts)
+    return low[:, 0], low[:, 1], high[:, 0] - low[:, 0] + 1, high[:, 1] - low[:, 1] + 1
+
+def _component_rects(mask):
+    # A component is outermost when it touches the background surrounding the
+    # whole sheet. That background is flood-filled from a one-pixel frame with
+    # 4-connectivity, as findContours treats holes; shapes nested in another
+    # shape's hole never reach it.
+    padded = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    padded = cv2.threshold(padded, 0, 255, cv2.THRESH_BINARY, dst=padded)[1]
+    n, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(padded, 8, cv2.CV_32S, cv2.CCL_GRANA)
+
+    cv2.floodFill(padded, None, (0, 0), 128, flags=4)
+    touching = cv2.dilate(cv2.compare(padded, 128, cv2.CMP_EQ), _CROSS)
+    touching = cv2.bitwise_and(touching, cv2.compare(padded, 255, cv2.CMP_EQ), dst=touching)
+    outer = np.zeros(n, dtype=bool)
+    outer[labels[touching.view(bool)]] = True
+    outer[0] = False
+
+    stats = stats[outer].astype(np.int64)
+    return (stats[:, cv2.CC_STAT_LEFT] - 1, stats[:, cv2.CC_STAT_TOP] - 1,
+            stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT])
+
+def _box_sums(binary, boxes):
+    """
+    Sum of a 0/255 image inside each (x1, y1, x2, y2) box, divided by 255.
+
+    Integral images are built one horizontal band at a time, so the extra
+    memory stays at a few MB whatever the sheet size.
+    """
+    height, width = binary.shape[:2]
+    band = max(1, (1 << 22) // max(width, 1))
+    sums = np.zeros(len(boxes), np.float64)
+    for y0 in range(0, height, band):
+        y1 = min(y0 + band, height)
+        rows = (boxes[:, 1] < y1) & (boxes[:, 3] > y0)
+        if not rows.any():
+            continue
+        integral = cv2.integral(binary[y0:y1], sdepth=cv2.CV_64F)
+        b = boxes[rows]
+        top, bottom = np.clip(b[:, 1] - y0, 0, y1 - y0), np.clip(b[:, 3] - y0, 0, y1 - y0)
+        left, right = b[:, 0], b[:, 2]
+        sums[rows] += (integral[bottom, right] - integral[top, right]
+                       - integral[bottom, left] + integral[top, left])
+    return sums / 255
+
+@traced("score_boxes")
+def score_boxes(mask, edges, boxes, min_area=50):
+    """
+    Cheap 0-1 plausibility score of candidate symbol boxes, before any OCR.
+
+    The score is the mean of three terms, each clipped to [0, 1]: size (log of
+    the area over min_area, reaching 1 at 64x min_area), fill (foreground
+    share of the box, reaching 1 at 25%) and edge density (edge pixels per
+    box pixel, reaching 1 at 10%). Specks, thin stray lines and empty frames
+    score low.
+
+    Args:
+        mask (np.ndarray): Binary mask from preprocess_image.
+        edges (np.ndarray): Canny edge mask of the same image.
+        boxes (list[tuple]): Boxes as (x1, y1, x2, y2).
+        min_area (int): Area that scores 0 on size.
+
+    Returns:
+        np.ndarray: float32 score per box.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    if not len(boxes):
+        return np.empty(0, np.float32)
+    area = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1).astype(np.float64)
+    size = np.log(area / max(min_area, 1)) / np.log(64)
+    fill = _box_sums(mask, boxes) / area / 0.25
+    edge_density = _box_sums(edges, boxes) / area / 0.1
+    scores = (np.clip(size, 0, 1) + np.clip(fill, 0, 1) + np.clip(edge_density, 0, 1)) / 3
+    return scores.astype(np.float32)
+
+@traced("detect_symbols")
+def detect_symbols(image, min_area=50, max_area=None, visualize=False, tile_size=None,
+                   merge_tolerance=(20, 20), ocr_mode="per_box", ocr_block_size=None, pool=None,
+                   cache=None, as_table=False, score_threshold=None, max_symbols=None, job=None):
+    """
+    Detect symbol boxes and the text inside them.
+
+    ocr_mode selects how text is read: "per_box" runs Tesseract on every merged
+    box, "page" OCRs the page once (or in blocks of ocr_block_size pixels) and
+    assigns words to the boxes that contain them. Passing an OCRPool spreads the
+    Tesseract calls of either mode over its worker processes. With a
+    ResultCache, both the whole result and the OCR of individual boxes are
+    reused when the same pixels are seen again. With as_table=True the symbols
+    come back as a DetectionTable instead of a list of dicts.
+
+    Setting score_threshold or max_symbols bounds the work: merged boxes are
+    scored with score_boxes, those below the threshold are dropped and only
+    the max_symbols best are kept, before any per-box OCR. The scores are
+    stored in the DetectionTable. In "page" mode the page OCR still runs in
+    full; only the assignment is bounded.
+
+    With a background job, the detection stops between tiles, stages and
+    per-box OCR calls once the job is cancelled, raising DetectionCancelled.
+    """
+    if ocr_mode not in ("per_box", "page"):
+        raise ValueError(f"Unknown ocr_mode: {ocr_mode}")
+
+    if cache is not None:
+        key = make_cache_key("detect_symbol_table", image, min_area=min_area, max_area=max_area,
+                             merge_tolerance=tuple(merge_tolerance), ocr_mode=ocr_mode,
+                             ocr_block_size=ocr_block_size, ocr_config=OCR_CONFIG,
+                             min_conf=OCR_MIN_CONFIDENCE, score_threshold=score_threshold,
+                             max_symbols=max_symbols)
+        table = cache.get(key)
+        if table is None:
+            table = _detect_symbol_data(image, min_area, max_area, tile_size, merge_tolerance, ocr_mode,
+                                        ocr_block_size, pool, cache, score_threshold, max_symbols, job)
+            cache.put(key, table)
+    else:
+        table = _detect_symbol_data(image, min_area, max_area, tile_size, merge_tolerance, ocr_mode,
+                                    ocr_block_size, pool, cache, score_threshold, max_symbols, job)
+
+    symbol_data = table if as_table else table.to_records()
     if visualize:
-        for symbol in symbol_data:
-            x1, y1, x2, y2 = symbol['BoundingBox']
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            for text_info in symbol['Text']:
-                tx1, ty1, tx2, ty2 = text_info['relative_bounding_box']
-                cv2.rectangle(image, (tx1, ty1), (tx2, ty2), (255, 0, 0), 1)
+        _draw_symbols(image, symbol_data)
 
     return image, symbol_data
+
+def _detect_symbol_data(image, min_area, max_area, tile_size, merge_tolerance, ocr_mode,
+                        ocr_block_size, pool, cache, score_threshold=None, max_symbols=None, job=None):
+    bounded = score_threshold is not None or max_symbols is not None
+    edges = np.empty(image.shape[:2], np.uint8) if bounded else None
+    mask = preprocess_image(image, tile_size=tile_size, edges_out=edges, job=job)
+    memory_snapshot("after preprocess_image")
+    _check_cancelled(job)
+    boxes = [tuple(b) for b in extract_boxes(mask, min_area, max_area).tolist()]
+    count("boxes_kept", len(boxes))
+
+    merged_boxes = merge_boxes(boxes, tolerance=merge_tolerance)
+    count("boxes_merged", len(boxes) - len(merged_boxes))
+
+    _check_cancelled(job)
+    scores = None
+    if bounded:
+        scores = score_boxes(mask, edges, merged_boxes, min_area=min_area)
+        keep = np.arange(len(merged_boxes))
+        if score_threshold is not None:
+            keep = keep[scores >= score_threshold]
+        if max_symbols is not None and len(keep) > max_symbols:
+            best = np.argsort(-scores[keep], kind="stable")[:max_symbols]
+            keep = np.sort(keep[best])
+        count("boxes_dropped", len(merged_boxes) - len(keep))
+        merged_boxes = [merged_boxes[i] for i in keep]
+        scores = scores[keep]
+        del edges
+
+    _check_cancelled(job)
+    if ocr_mode == "page":
+        page_text = detect_text_blocks(image, ocr_block_size, pool=pool, cache=cache)
+        box_texts = assign_text_to_boxes(page_text, merged_boxes)
+    else:
+        rois = (image[y1:y2, x1:x2] for x1, y1, x2, y2 in merged_boxes)
+        roi_texts = _detect_text_batch(rois, pool=pool, cache=cache, job=job)
+
+        box_texts = []
+        for (x1, y1, x2, y2), text_results in zip(merged_boxes, roi_texts):
+            for t in text_results:
+                t['relative_bounding_box'] = (
+                    x1 + t['bounding_box'][0],
+                    y1 + t['bounding_box'][1],
+                    x1 + t['bounding_box'][2],
+                    y1 + t['bounding_box'][3]
+                )
+            box_texts.append(text_results)
+
+    return DetectionTable.from_boxes(merged_boxes, box_texts, scores=scores)
+
+def _draw_symbols(image, symbol_data):
+    for symbol in symbol_data:
+        x1, y1, x2, y2 = symbol['BoundingBox']
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        for text_info in symbol['Text']:
+            tx1, ty1, tx2, ty2 = text_info['relative_bounding_box']
+            cv2.rectangle(image, (tx1, ty1), (tx2, ty2), (255, 0, 0), 1)
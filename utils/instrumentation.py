@@ -0,0 +1,246 @@
+"""
+Lightweight timing, counter and memory instrumentation.
+
+Disabled by default; when off, span() hands back a shared no-op object and
+count() returns immediately, so instrumented code pays almost nothing. Turn it
+on with enable(), or by setting BLUEPRINT_TRACE=1 before start-up. Setting
+BLUEPRINT_TRACE to a .json path also writes a Chrome trace there on exit
+(open it in chrome://tracing or https://ui.perfetto.dev).
+
+Span timings are logged at DEBUG level through the application loggers set up
+by utils.logging_setup; log_summary() writes per-span totals at INFO.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import logging
+import threading
+from collections import deque, defaultdict
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "BLUEPRINT_TRACE"
+MAX_EVENTS = 1_000_000
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_counters = defaultdict(int)
+_span_stats = defaultdict(lambda: [0, 0.0, 0.0])  # calls, total seconds, max seconds
+_epoch_ns = time.perf_counter_ns()
+_enabled = False
+
+
+def enable(flag=True):
+    """Switch instrumentation on or off at runtime."""
+    global _enabled
+    _enabled = bool(flag)
+    logger.info(f"Instrumentation {'enabled' if _enabled else 'disabled'}")
+
+
+def disable():
+    enable(False)
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Drop all recorded spans, counters and snapshots."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _span_stats.clear()
+
+
+def _now_us():
+    return (time.perf_counter_ns() - _epoch_ns) / 1000
+
+
+class Span:
+    """A timed region; use as a context manager or call end() explicitly."""
+
+    __slots__ = ("name", "args", "_start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self._start = time.perf_counter_ns()
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.end()
+
+    def end(self):
+        end = time.perf_counter_ns()
+        seconds = (end - self._start) / 1e9
+        event = {"name": self.name, "ph": "X", "ts": (self._start - _epoch_ns) / 1000,
+                 "dur": (end - self._start) / 1000, "pid": os.getpid(), "tid": threading.get_ident()}
+        if self.args:
+            event["args"] = self.args
+        with _lock:
+            _events.append(event)
+            stats = _span_stats[self.name]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        logger.debug(f"⏱ {self.name} {seconds * 1000:.1f} ms" + (f" {self.args}" if self.args else ""))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def end(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    """
+    Time a region of code.
+
+    Args:
+        name (str): Span name, e.g. "preprocess_image".
+        **args: Extra values stored with the span in the trace.
+
+    Returns:
+        Span: Context manager; a shared no-op when instrumentation is off.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def traced(name=None):
+    """Decorator running the whole function inside a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, None):
+                return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Add n to a named counter (e.g. "ocr_calls")."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += n
+        value = _counters[name]
+        _events.append({"name": name, "ph": "C", "ts": _now_us(), "pid": os.getpid(),
+                        "args": {name: value}})
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Peak rather than current RSS, in KB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_snapshot(label):
+    """
+    Record the process RSS (and traced Python allocations if tracemalloc runs).
+
+    Returns:
+        dict | None: The snapshot, or None when instrumentation is off.
+    """
+    if not _enabled:
+        return None
+    snapshot = {"rss_mb": (_rss_bytes() or 0) / (1024 * 1024)}
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot.update(traced_mb=current / (1024 * 1024), traced_peak_mb=peak / (1024 * 1024))
+    with _lock:
+        _events.append({"name": "memory", "ph": "C", "ts": _now_us(), "pid": os.getpid(),
+                        "args": {k: round(v, 2) for k, v in snapshot.items()}})
+        _events.append({"name": label, "ph": "i", "s": "p", "ts": _now_us(), "pid": os.getpid(),
+                        "tid": threading.get_ident(), "args": snapshot})
+    logger.debug(f"🧠 {label}: RSS {snapshot['rss_mb']:.0f} MB")
+    return snapshot
+
+
+def get_counters():
+    with _lock:
+        return dict(_counters)
+
+
+def summary():
+    """
+    Per-span totals.
+
+    Returns:
+        dict: {span: {"calls", "total_ms", "mean_ms", "max_ms"}}.
+    """
+    with _lock:
+        return {
+            name: {"calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls,
+                   "max_ms": peak * 1000}
+            for name, (calls, total, peak) in _span_stats.items()
+        }
+
+
+def log_summary():
+    """Write span totals and counters to the log."""
+    spans = sorted(summary().items(), key=lambda item: -item[1]["total_ms"])
+    for name, s in spans:
+        logger.info(f"{name}: {s['calls']} calls, {s['total_ms']:.1f} ms total, "
+                    f"{s['mean_ms']:.1f} ms mean, {s['max_ms']:.1f} ms max")
+    for name, value in sorted(get_counters().items()):
+        logger.info(f"{name}: {value}")
+
+
+def export_chrome_trace(path):
+    """
+    Write recorded events in the Chrome trace event format.
+
+    Args:
+        path (str): Output .json file.
+    """
+    with _lock:
+        events = list(_events)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+    logger.info(f"Trace with {len(events)} events written to {path}")
+
+
+def _configure_from_env():
+    value = os.getenv(ENV_VAR, "")
+    if value.lower() in ("", "0", "false", "off"):
+        return
+    enable()
+    if value.lower().endswith(".json"):
+        atexit.register(export_chrome_trace, value)
+
+
+_configure_from_env()
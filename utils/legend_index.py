@@ -0,0 +1,111 @@
+import logging
+
+import numpy as np
+
+from utils.image_tools import detect_symbols, detect_text_blocks
+from utils.detection_table import WordTable
+from utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CELL_SIZE = 64
+
+
+class _GridIndex:
+    """
+    Uniform grid over points, stored as one sorted index array per cell row.
+
+    Items are sorted by cell (row-major), so the candidates of a rectangle are
+    one contiguous slice per grid row it covers.
+    """
+
+    def __init__(self, points, cell_size):
+        self.cell_size = cell_size
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        cells = np.maximum(points, 0) // cell_size
+        self.n_cols = int(cells[:, 0].max()) + 1 if len(cells) else 1
+        self.n_rows = int(cells[:, 1].max()) + 1 if len(cells) else 1
+        cell_ids = cells[:, 1] * self.n_cols + cells[:, 0]
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.offsets = np.zeros(self.n_rows * self.n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_ids, minlength=self.n_rows * self.n_cols), out=self.offsets[1:])
+
+    def candidates(self, bbox):
+        """Indices of the items in every cell overlapping (x1, y1, x2, y2)."""
+        x1, y1, x2, y2 = bbox
+        cx1, cy1 = max(x1, 0) // self.cell_size, max(y1, 0) // self.cell_size
+        cx2 = min(max(x2, 0) // self.cell_size, self.n_cols - 1)
+        cy2 = min(max(y2, 0) // self.cell_size, self.n_rows - 1)
+        if cx1 > cx2 or cy1 > cy2:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(cy1, cy2 + 1) * self.n_cols
+        starts, stops = self.offsets[rows + cx1], self.offsets[rows + cx2 + 1]
+        return np.concatenate([self.order[a:b] for a, b in zip(starts, stops)])
+
+
+class LegendIndex:
+    """
+    All symbols and words of a legend crop, indexed for rectangle queries.
+
+    The legend is analysed once (symbol boxes, and page-level OCR for the
+    words); a user selection is then answered from the index instead of
+    re-running detection on the selected pixels. Symbols are indexed by their
+    top-left corner and words by their centre, each in a uniform grid.
+
+    Args:
+        symbols (DetectionTable): Symbols in legend coordinates.
+        words (WordTable): Words in legend coordinates.
+        cell_size (int): Grid cell side in pixels.
+    """
+
+    def __init__(self, symbols, words, cell_size=DEFAULT_CELL_SIZE):
+        self.symbols = symbols
+        self.words = words
+        self._symbol_grid = _GridIndex(symbols.boxes[:, :2], cell_size)
+        centres = (words.boxes[:, :2].astype(np.int64) + words.boxes[:, 2:]) // 2
+        self._word_centres = centres
+        self._word_grid = _GridIndex(centres, cell_size)
+
+    @classmethod
+    def build(cls, image, pool=None, cache=None, job=None, cell_size=DEFAULT_CELL_SIZE):
+        """
+        Detect everything in a legend image and index it.
+
+        The page OCR is run once; with a ResultCache, detect_symbols reuses it
+        for the words inside the symbols.
+
+        Args:
+            image (np.ndarray): RGB legend crop.
+            pool (OCRPool | None): Worker pool for the OCR.
+            cache (ResultCache | None): Cache for detection and OCR results.
+            job (Job | None): Background job; building stops early once it
+                is cancelled.
+
+        Returns:
+            LegendIndex | None: The index, or None if the job was cancelled.
+        """
+        with span("legend_index_build", width=image.shape[1], height=image.shape[0]):
+            words = WordTable.from_records(detect_text_blocks(image, pool=pool, cache=cache))
+            if job is not None and job.cancelled:
+                return None
+            _, symbols = detect_symbols(image, ocr_mode="page", pool=pool, cache=cache, as_table=True)
+            index = cls(symbols, words, cell_size=cell_size)
+        logger.info(f"Legend indexed: {len(symbols)} symbols, {len(words)} words")
+        return index
+
+    def query_symbols(self, bbox):
+        """Symbols lying entirely inside (x1, y1, x2, y2), as a DetectionTable."""
+        x1, y1, x2, y2 = bbox
+        candidates = np.sort(self._symbol_grid.candidates(bbox))
+        boxes = self.symbols.boxes[candidates]
+        inside = ((boxes[:, 0] >= x1) & (boxes[:, 1] >= y1) & (boxes[:, 2] <= x2) & (boxes[:, 3] <= y2))
+        return self.symbols.filter(candidates[inside])
+
+    def query_words(self, bbox):
+        """Words whose centre lies inside (x1, y1, x2, y2), in reading order, as a WordTable."""
+        x1, y1, x2, y2 = bbox
+        candidates = np.sort(self._word_grid.candidates(bbox))
+        centres = self._word_centres[candidates]
+        inside = ((centres[:, 0] >= x1) & (centres[:, 0] < x2) &
+                  (centres[:, 1] >= y1) & (centres[:, 1] < y2))
+        return self.words.take(candidates[inside])
@@ -0,0 +1,156 @@
+import os
+import atexit
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from utils.image_tools import detect_text
+
+logger = logging.getLogger(__name__)
+
+# Seconds added on top of the Tesseract timeout before a caller gives up on a
+# result, to cover pickling and queueing inside the pool.
+RESULT_GRACE = 5.0
+
+
+class OCRQueueFull(RuntimeError):
+    """Raised when a non-blocking submit finds the submission queue full."""
+
+
+def _init_worker():
+    # One OCR job per core: keep Tesseract's OpenMP and OpenCV single-threaded
+    # so the workers do not oversubscribe the machine.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    cv2.setNumThreads(1)
+
+
+def _run_job(image, timeout):
+    return detect_text(image, timeout=timeout)
+
+
+class OCRPool:
+    """
+    Pool of long-lived OCR worker processes with a bounded submission queue.
+
+    Workers are started once and reused, so the Python/OpenCV start-up cost is
+    paid per worker instead of per call. submit() blocks (or raises
+    OCRQueueFull) while max_pending jobs are in flight, which keeps producers
+    such as detect_symbols from queueing thousands of ROIs at once.
+
+    Workers are spawned rather than forked: the pool is usually first used
+    from a background thread of the Tk app, and a child forked from a
+    multithreaded process can deadlock on a lock another thread held at the
+    time of the fork.
+
+    Args:
+        max_workers (int | None): Worker processes; defaults to the CPU count.
+        max_pending (int | None): Jobs allowed in flight before submit() applies
+            backpressure; defaults to four per worker.
+        timeout (float): Per-job Tesseract timeout in seconds (0 disables it).
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=30):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._closed = False
+
+    def _get_executor(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("OCR pool has been shut down")
+            if self._executor is None:
+                logger.info(f"Starting OCR pool with {self.max_workers} workers")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def submit(self, image, block=True, timeout=None):
+        """
+        Queue an OCR job for an RGB image.
+
+        Args:
+            image (np.ndarray): RGB image to OCR.
+            block (bool): Wait for a free slot when the queue is full.
+            timeout (float | None): Maximum time to wait for a slot.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the detect_text result.
+        """
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            raise OCRQueueFull(f"OCR queue is full ({self.max_pending} jobs pending)")
+
+        try:
+            future = self._get_executor().submit(_run_job, image, self.timeout)
+        except BrokenProcessPool:
+            logger.warning("OCR pool broken, restarting workers")
+            with self._lock:
+                self._executor = None
+            try:
+                future = self._get_executor().submit(_run_job, image, self.timeout)
+            except Exception:
+                self._slots.release()
+                raise
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def result_timeout(self):
+        return self.timeout + RESULT_GRACE if self.timeout else None
+
+    def run(self, image):
+        """Submit a job and wait for its result."""
+        return self.submit(image).result(timeout=self.result_timeout())
+
+    def map(self, images):
+        """OCR several images, yielding results in input order."""
+        futures = []
+        for image in images:
+            futures.append(self.submit(image))
+        for future in futures:
+            yield future.result(timeout=self.result_timeout())
+
+    async def run_async(self, image):
+        """Awaitable variant of run() that never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, self.submit, image)
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.result_timeout())
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """Return the process-wide OCR pool, creating it on first use."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = OCRPool()
+            atexit.register(_shared_pool.shutdown, wait=False)
+        return _shared_pool
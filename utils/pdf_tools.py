@@ -1,14 +1,31 @@
+import io
 import os
+import re
+import time
 import logging
+import subprocess
 from pathlib import Path
-from pdf2image import convert_from_path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pdf2image import convert_from_path, pdfinfo_from_path
+import numpy as np
 from PIL import Image
 from tqdm import tqdm
+from utils.instrumentation import span, count, traced, memory_snapshot
 
 # Allow very large blueprint images
 Image.MAX_IMAGE_PIXELS = None
 logger = logging.getLogger(__name__)
 
+# Two-tier rasterization: the whole sheet at OVERVIEW_DPI for navigation and
+# selection, selected regions re-rendered from the PDF at DETAIL_DPI.
+OVERVIEW_DPI = 150
+DETAIL_DPI = 600
+PREVIEW_DPI = 36
+
+class RenderCancelled(Exception):
+    """Raised when a region render is cancelled before pdftoppm finishes."""
+
 def convert_pdf_to_image(pdf_path, output_dir="converted_images", dpi=600, image_format="PNG"):
     """
     Convert the first page of a PDF to a high-resolution image.
@@ -28,20 +45,215 @@ def convert_pdf_to_image(pdf_path, output_dir="converted_images", dpi=600, image
         out_path.mkdir(parents=True, exist_ok=True)
 
         logger.info(f"Converting PDF to image: {pdf_path}")
-        images = convert_from_path(pdf_path, dpi=dpi, fmt=image_format.lower())
-        if not images:
-            logger.warning(f"No pages found in {pdf_path}")
-            return None
+        for _, image in iter_pdf_pages(pdf_path, dpi=dpi, pages=[1]):
+            image_file = out_path / f"{pdf_name}_page1.{image_format.lower()}"
+            save_image(image, image_file, image_format)
+            logger.info(f"Saved image: {image_file}")
+            return str(image_file)
 
-        image_file = out_path / f"{pdf_name}_page1.{image_format.lower()}"
-        save_image(images[0], image_file, image_format)
-        logger.info(f"Saved image: {image_file}")
-        return str(image_file)
+        logger.warning(f"No pages found in {pdf_path}")
+        return None
 
     except Exception as e:
         logger.error(f"Failed to convert {pdf_path}: {e}")
         return None
 
+def get_page_count(pdf_path):
+    """Return the number of pages in a PDF."""
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def iter_pdf_pages(pdf_path, dpi=600, pages=None):
+    """
+    Rasterize a PDF one page at a time.
+
+    Only the page being yielded is held in memory, so memory use does not grow
+    with the number of pages.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        dpi (int): Resolution for conversion.
+        pages (Iterable[int] | None): 1-based page numbers to render, or None
+            for every page.
+
+    Yields:
+        tuple[int, PIL.Image.Image]: Page number and its rendered image.
+    """
+    if pages is None:
+        pages = range(1, get_page_count(pdf_path) + 1)
+
+    for page in pages:
+        # PPM is the cheapest format to move from pdftoppm to PIL; the output
+        # format is applied when the page is saved.
+        with span("rasterize_page", page=page, dpi=dpi):
+            images = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)
+        if not images:
+            continue
+        count("pages_rasterized")
+        memory_snapshot(f"page {page} rasterized")
+        image = images.pop()
+        del images
+        yield page, image
+        del image
+
+def _run_pdftoppm(args, cancel_event=None, timeout=None, poll_interval=0.05):
+    """
+    Run pdftoppm with its output on stdout and decode it.
+
+    The process is killed when cancel_event is set or the timeout passes.
+
+    Returns:
+        np.ndarray: RGB image.
+
+    Raises:
+        RenderCancelled: If cancel_event was set.
+        RuntimeError: If pdftoppm fails or times out.
+    """
+    process = subprocess.Popen(["pdftoppm", *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        start = time.monotonic()
+        while True:
+            try:
+                # communicate() drains the pipes, so large rasters cannot block pdftoppm.
+                stdout, stderr = process.communicate(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RenderCancelled("Render cancelled")
+                if timeout is not None and time.monotonic() - start > timeout:
+                    raise RuntimeError(f"pdftoppm timed out after {timeout}s")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"pdftoppm failed ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+    with Image.open(io.BytesIO(stdout)) as image:
+        return np.asarray(image.convert("RGB"))
+
+def render_pdf_page(pdf_path, dpi=OVERVIEW_DPI, page=1, cancel_event=None, timeout=None):
+    """
+    Rasterize one PDF page to an RGB array, cancellably.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        dpi (int): Output resolution.
+        page (int): 1-based page number.
+        cancel_event (threading.Event | None): Set it to stop the render.
+        timeout (float | None): Seconds before the render is abandoned.
+
+    Returns:
+        np.ndarray: RGB page image.
+    """
+    with span("rasterize_page", page=page, dpi=dpi):
+        image = _run_pdftoppm(["-f", str(page), "-l", str(page), "-r", str(dpi), "-singlefile", str(pdf_path)],
+                              cancel_event=cancel_event, timeout=timeout)
+    count("pages_rasterized")
+    memory_snapshot(f"page {page} rasterized")
+    return image
+
+def render_pdf_region(pdf_path, bbox, source_dpi, dpi=DETAIL_DPI, page=1, cancel_event=None, timeout=None):
+    """
+    Rasterize one rectangle of a PDF page at a higher resolution.
+
+    The rectangle is given in pixels of a raster of the same page made at
+    source_dpi (e.g. the overview image), and is scaled to dpi. pdftoppm only
+    renders the requested pixels, so the cost follows the region size rather
+    than the sheet size.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        bbox (tuple[int, int, int, int]): (x1, y1, x2, y2) in source_dpi pixels.
+        source_dpi (int): Resolution the bbox coordinates refer to.
+        dpi (int): Output resolution.
+        page (int): 1-based page number.
+        cancel_event (threading.Event | None): Set it to stop the render.
+        timeout (float | None): Seconds before the render is abandoned.
+
+    Returns:
+        np.ndarray: RGB image of the region at dpi.
+
+    Raises:
+        RenderCancelled: If cancel_event was set.
+        RuntimeError: If pdftoppm fails or times out.
+    """
+    scale = dpi / source_dpi
+    x1, y1, x2, y2 = bbox
+    x, y = int(np.floor(x1 * scale)), int(np.floor(y1 * scale))
+    width, height = int(np.ceil(x2 * scale)) - x, int(np.ceil(y2 * scale)) - y
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Empty region {bbox}")
+
+    args = ["-f", str(page), "-l", str(page), "-r", str(dpi), "-x", str(x), "-y", str(y),
+            "-W", str(width), "-H", str(height), "-singlefile", str(pdf_path)]
+    with span("render_pdf_region", page=page, dpi=dpi, width=width, height=height):
+        image = _run_pdftoppm(args, cancel_event=cancel_event, timeout=timeout)
+    count("regions_rendered")
+    return image
+
+def import_pdf(pdf_path, output_dir="converted_images", dpi=OVERVIEW_DPI, preview_dpi=PREVIEW_DPI,
+               on_preview=None, on_status=None, cancel_event=None):
+    """
+    Rasterize the first page of a PDF for the app: a quick preview first, then
+    the working raster, which is also saved as a PNG.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        output_dir (str): Directory to save the converted image.
+        dpi (int): Resolution of the working raster.
+        preview_dpi (int): Resolution of the preview; 0 skips it.
+        on_preview (Callable[[np.ndarray], None] | None): Receives the preview.
+        on_status (Callable[[str], None] | None): Receives progress messages.
+        cancel_event (threading.Event | None): Set it to stop the import.
+
+    Returns:
+        tuple[str, np.ndarray]: Path of the saved image and its RGB pixels.
+    """
+    status = on_status or (lambda message: None)
+    pdf_name = Path(pdf_path).stem
+    out_path = Path(output_dir) / pdf_name
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    with span("import_pdf", path=pdf_path, dpi=dpi):
+        if preview_dpi and on_preview is not None and preview_dpi < dpi:
+            status("Rendering preview...")
+            on_preview(render_pdf_page(pdf_path, dpi=preview_dpi, cancel_event=cancel_event))
+
+        status(f"Rendering page at {dpi} DPI...")
+        image = render_pdf_page(pdf_path, dpi=dpi, cancel_event=cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            raise RenderCancelled("Render cancelled")
+
+        status("Saving image...")
+        image_file = out_path / f"{pdf_name}_page1.png"
+        save_image(Image.fromarray(image), image_file, "PNG")
+    logger.info(f"Saved image: {image_file}")
+    return str(image_file), image
+
+def convert_pdf_pages(pdf_path, output_dir, dpi=600, image_format="PNG", pages=None):
+    """
+    Stream selected pages (or all pages) of a PDF to image files.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        output_dir (str): Directory to save converted images.
+        dpi (int): Resolution for conversion.
+        image_format (str): Output format ("PNG", "JPEG", "TIFF").
+        pages (Iterable[int] | None): 1-based page numbers, or None for all.
+
+    Returns:
+        list[str]: Paths of the written images, in page order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = Path(pdf_path).stem
+    written = []
+    for page, image in iter_pdf_pages(pdf_path, dpi=dpi, pages=pages):
+        out_path = Path(output_dir) / f"{base_name}_page_{page}.{image_format.lower()}"
+        save_image(image, out_path, image_format)
+        del image
+        written.append(str(out_path))
+    return written
+
 def convert_pdfs_to_images(input_folder, output_folder, dpi=600, image_format="PNG"):
     """
     Batch convert all PDFs in a folder to high-quality images.
@@ -62,18 +274,187 @@ def convert_pdfs_to_images(input_folder, output_folder, dpi=600, image_format="P
     for pdf_file in tqdm(pdf_files, desc="Processing PDFs"):
         pdf_path = os.path.join(input_folder, pdf_file)
         try:
-            images = convert_from_path(pdf_path, dpi=dpi, fmt=image_format.lower())
-            base_name = Path(pdf_file).stem
-            for i, image in enumerate(images):
-                file_name = f"{base_name}_page_{i+1}.{image_format.lower()}"
-                out_path = Path(output_folder) / file_name
-                save_image(image, out_path, image_format)
+            convert_pdf_pages(pdf_path, output_folder, dpi=dpi, image_format=image_format)
             logger.info(f"✔ {pdf_file} converted successfully.")
         except Exception as e:
             logger.error(f"❌ Error processing {pdf_file}: {e}")
 
     logger.info(f"✅ Batch conversion completed in '{output_folder}'.")
 
+def get_page_sizes(pdf_path):
+    """
+    Return the size of every page of a PDF in points.
+
+    Returns:
+        dict[int, tuple[float, float]]: Page number to (width, height).
+    """
+    page_count = get_page_count(pdf_path)
+    info = pdfinfo_from_path(pdf_path, first_page=1, last_page=page_count)
+    sizes = {}
+    for key, value in info.items():
+        page = re.match(r"Page\s+(\d+) size", key)
+        dims = re.match(r"([\d.]+) x ([\d.]+)", str(value))
+        if page and dims:
+            sizes[int(page.group(1))] = (float(dims.group(1)), float(dims.group(2)))
+    if not sizes:
+        # Older pdfinfo builds only report one "Page size" for the document.
+        dims = re.match(r"([\d.]+) x ([\d.]+)", str(info.get("Page size", "")))
+        width, height = (float(dims.group(1)), float(dims.group(2))) if dims else (612.0, 792.0)
+        sizes = {page: (width, height) for page in range(1, page_count + 1)}
+    return sizes
+
+def estimate_page_memory(page_size, dpi):
+    """
+    Rough peak memory, in bytes, of rendering and saving one page.
+
+    pdftoppm's output, the decoded RGB image and the encoder's buffers are each
+    about one RGB raster, hence the factor of three.
+    """
+    width_pt, height_pt = page_size
+    pixels = (width_pt / 72 * dpi) * (height_pt / 72 * dpi)
+    return int(pixels * 3 * 3)
+
+def _convert_page_job(pdf_path, page, output_folder, dpi, image_format):
+    return convert_pdf_pages(pdf_path, output_folder, dpi=dpi, image_format=image_format, pages=[page])
+
+@traced("convert_pdfs_to_images_parallel")
+def convert_pdfs_to_images_parallel(input_folder, output_folder, dpi=600, image_format="PNG",
+                                    max_workers=None, memory_budget_mb=None, retries=2):
+    """
+    Batch convert all PDFs in a folder using a process pool.
+
+    Every page is a separate job, so large drawing sets are spread across all
+    workers. A job is only started while the estimated memory of the jobs in
+    flight stays within memory_budget_mb (one job always runs). Failed pages
+    and files are retried up to `retries` times; the rest of the batch carries
+    on regardless. If a worker dies (e.g. killed for running out of memory),
+    the broken pool is replaced and the pages that were in flight are rerun
+    one at a time without using up their retries; only a page that kills its
+    worker while running alone counts the failure against its retries.
+
+    Args:
+        input_folder (str): Folder containing PDF files.
+        output_folder (str): Output folder for images.
+        dpi (int): Resolution for conversion.
+        image_format (str): Output format ("PNG", "JPEG", "TIFF").
+        max_workers (int | None): Worker processes; defaults to the CPU count.
+        memory_budget_mb (int | None): Cap on the estimated memory of
+            concurrent jobs, or None for no cap.
+        retries (int): Extra attempts for each failed page or file.
+
+    Returns:
+        dict: "pages" converted, "failed" pages per file (None when the whole
+            file failed), "seconds" elapsed and "pages_per_second".
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    pdf_files = sorted(f for f in os.listdir(input_folder) if f.lower().endswith(".pdf"))
+    summary = {"pages": 0, "failed": {}, "seconds": 0.0, "pages_per_second": 0.0}
+    if not pdf_files:
+        logger.warning("❌ No PDF files found in the folder.")
+        return summary
+
+    start = time.perf_counter()
+    jobs = []
+    for pdf_file in pdf_files:
+        pdf_path = os.path.join(input_folder, pdf_file)
+        for attempt in range(retries + 1):
+            try:
+                sizes = get_page_sizes(pdf_path)
+                break
+            except Exception as e:
+                logger.warning(f"Could not read {pdf_file} (attempt {attempt + 1}): {e}")
+        else:
+            logger.error(f"❌ Error processing {pdf_file}: giving up after {retries + 1} attempts")
+            summary["failed"][pdf_file] = None
+            continue
+        for page, size in sorted(sizes.items()):
+            jobs.append((pdf_file, page, estimate_page_memory(size, dpi)))
+
+    budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+    workers = max_workers or os.cpu_count() or 1
+    attempts = {}
+    in_flight = {}
+    in_flight_bytes = 0
+    pending = list(reversed(jobs))
+    # Pages that were in flight when a worker died. Any of them may have
+    # killed it, so they run one at a time until the culprit shows itself.
+    suspects = []
+
+    def retry_or_fail(job, error, queue):
+        pdf_file, page, _ = job
+        attempts[(pdf_file, page)] = attempts.get((pdf_file, page), 0) + 1
+        if attempts[(pdf_file, page)] <= retries:
+            logger.warning(f"Retrying {pdf_file} page {page}: {error}")
+            queue.append(job)
+        else:
+            logger.error(f"❌ Error processing {pdf_file} page {page}: {error}")
+            summary["failed"].setdefault(pdf_file, []).append(page)
+            progress.update(1)
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        with tqdm(total=len(jobs), desc="Processing PDF pages") as progress:
+            while pending or suspects or in_flight:
+                broken = None
+                isolated = bool(suspects)
+                queue = suspects if isolated else pending
+                limit = 1 if isolated else workers
+                while queue and len(in_flight) < limit:
+                    pdf_file, page, job_bytes = queue[-1]
+                    if in_flight and budget is not None and in_flight_bytes + job_bytes > budget:
+                        break
+                    try:
+                        future = executor.submit(_convert_page_job, os.path.join(input_folder, pdf_file),
+                                                 page, output_folder, dpi, image_format)
+                    except BrokenProcessPool as e:
+                        broken = e
+                        break
+                    queue.pop()
+                    in_flight[future] = (pdf_file, page, job_bytes)
+                    in_flight_bytes += job_bytes
+
+                lost = []
+                if broken is None and in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = in_flight.pop(future)
+                        in_flight_bytes -= job[2]
+                        try:
+                            future.result()
+                            summary["pages"] += 1
+                            progress.update(1)
+                        except BrokenProcessPool as e:
+                            broken = e
+                            lost.append(job)
+                        except Exception as e:
+                            retry_or_fail(job, e, pending)
+
+                if broken is not None:
+                    # A dead worker breaks the whole pool and every page in
+                    # flight is lost with it. A page that was running alone
+                    # is the culprit and uses up a retry; otherwise nobody is
+                    # charged and the lost pages are retried one at a time.
+                    lost.extend(in_flight.values())
+                    in_flight.clear()
+                    in_flight_bytes = 0
+                    logger.warning(f"Worker pool broke with {len(lost)} pages in flight; restarting it")
+                    if isolated and len(lost) == 1:
+                        retry_or_fail(lost[0], broken, suspects)
+                    else:
+                        suspects.extend(lost)
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["pages_per_second"] = summary["pages"] / summary["seconds"] if summary["seconds"] else 0.0
+    logger.info(f"✅ Batch conversion completed in '{output_folder}': {summary['pages']} pages in "
+                f"{summary['seconds']:.1f}s ({summary['pages_per_second']:.2f} pages/s), "
+                f"{len(summary['failed'])} files with failures.")
+    return summary
+
+@traced("save_image")
 def save_image(image, path, image_format):
     """Save image with format-specific options."""
     if image_format.upper() == "PNG":
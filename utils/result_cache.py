@@ -0,0 +1,194 @@
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(namespace, image, **params):
+    """
+    Content-addressed key for a detection result.
+
+    Args:
+        namespace (str): Name of the operation, e.g. "detect_text".
+        image (np.ndarray): Input pixels; shape and dtype are part of the key.
+        **params: Parameters that influence the result.
+
+    Returns:
+        str: Hex digest identifying (namespace, pixels, params).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(namespace.encode())
+    digest.update(repr((image.shape, str(image.dtype), sorted(params.items()))).encode())
+    if image.flags.c_contiguous:
+        digest.update(memoryview(image).cast("B"))
+    else:
+        for row in image:
+            digest.update(row.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for OCR and detection results.
+
+    Values are pickled once on insert. The in-memory tier is an LRU bounded by
+    the size of those pickles; the optional on-disk tier keeps one file per key
+    and evicts the least recently used files once max_disk_bytes is exceeded.
+    Every get() returns a fresh copy, so callers may mutate results freely.
+
+    Args:
+        cache_dir (str | Path | None): Directory for the on-disk tier, or None
+            for memory only.
+        max_memory_bytes (int): Budget of the in-memory tier.
+        max_disk_bytes (int): Budget of the on-disk tier.
+    """
+
+    def __init__(self, cache_dir=None, max_memory_bytes=64 * 1024 * 1024,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.pkl"))
+
+    def _disk_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, key, default=None):
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return pickle.loads(payload)
+
+            if self.cache_dir:
+                path = self._disk_path(key)
+                try:
+                    payload = path.read_bytes()
+                    os.utime(path)
+                except OSError:
+                    payload = None
+                if payload is not None:
+                    self.hits_disk += 1
+                    self._remember(key, payload)
+                    return pickle.loads(payload)
+
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, payload)
+            if self.cache_dir:
+                self._write_disk(key, payload)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, payload):
+        if len(payload) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _write_disk(self, key, payload):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            if path.exists():
+                self._disk_bytes -= path.stat().st_size
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(payload)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(payload)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+            return
+
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for p in self.cache_dir.glob("*/*.pkl"):
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        self._disk_bytes = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, p in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                p.unlink()
+                self._disk_bytes -= size
+            except OSError:
+                pass
+        logger.debug(f"Cache evicted down to {self._disk_bytes} bytes on disk")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.cache_dir:
+                for p in self.cache_dir.glob("*/*.pkl"):
+                    p.unlink(missing_ok=True)
+                self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes
+            }
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def get_result_cache(cache_dir=None):
+    """Return the process-wide cache for cache_dir, creating it on first use."""
+    key = str(Path(cache_dir).resolve()) if cache_dir else None
+    with _shared_lock:
+        if key not in _shared_caches:
+            _shared_caches[key] = ResultCache(cache_dir)
+        return _shared_caches[key]
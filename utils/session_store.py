@@ -0,0 +1,296 @@
+import os
+import json
+import uuid
+import zlib
+import struct
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from utils.state_manager import WorkflowState
+from utils.detection_table import DetectionTable, WordTable
+
+logger = logging.getLogger(__name__)
+
+SESSION_EXTENSION = ".bvs"
+SESSION_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+
+# Journal record header: payload length and CRC32 of the payload.
+_RECORD = struct.Struct("<II")
+
+_SYMBOL_KEYS = {"Symbol_ID", "X", "Y", "Width", "Height", "BoundingBox", "Text"}
+_WORD_KEYS = {"text", "confidence", "bounding_box"}
+_WORD_OPTIONAL_KEYS = {"relative_bounding_box"}
+
+
+class LazyList(list):
+    """
+    List whose items are decoded from the session file on first use.
+
+    len() is known from the snapshot header and does not trigger loading, so
+    summaries stay cheap. Anything that looks at or changes the items loads
+    them first, after which this behaves exactly like a list.
+    """
+
+    def __init__(self, iterable=(), loader=None, length=0):
+        super().__init__(iterable)
+        self._loader = loader
+        self._length = length
+
+    def _materialize(self):
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            list.extend(self, loader())
+
+    def __len__(self):
+        return self._length if self._loader is not None else list.__len__(self)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def _materializing(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._materialize()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("__iter__", "__reversed__", "__getitem__", "__setitem__", "__delitem__", "__contains__",
+              "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__", "__add__", "__iadd__",
+              "__mul__", "__rmul__", "__imul__", "__repr__", "append", "extend", "insert", "pop",
+              "remove", "clear", "index", "count", "sort", "reverse", "copy"):
+    setattr(LazyList, _name, _materializing(_name))
+
+
+def _is_word_table(words):
+    return all(isinstance(w, dict) and _WORD_KEYS <= w.keys() <= _WORD_KEYS | _WORD_OPTIONAL_KEYS
+               for w in words)
+
+
+def _is_symbol_table(symbols):
+    return all(isinstance(s, dict) and s.keys() == _SYMBOL_KEYS and _is_word_table(s["Text"])
+               for s in symbols)
+
+
+class SessionJournal:
+    """
+    Append-only log of small state changes made after the last snapshot.
+
+    Each record is a length/CRC32 header followed by a JSON payload. The first
+    record names the snapshot generation the journal belongs to, so a journal
+    left over from an older snapshot is never replayed on top of a newer one.
+    A torn record at the end (crash mid-write) ends the replay.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @staticmethod
+    def _pack(record):
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def reset(self, generation):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self._pack({"op": "begin", "generation": generation}))
+        os.replace(tmp, self.path)
+
+    def append(self, op, **payload):
+        with open(self.path, "ab") as f:
+            f.write(self._pack({"op": op, **payload}))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def records(self):
+        if not self.path.exists():
+            return
+        data = self.path.read_bytes()
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            length, crc = _RECORD.unpack_from(data, pos)
+            payload = data[pos + _RECORD.size:pos + _RECORD.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                logger.warning(f"Ignoring truncated record at byte {pos} of {self.path}")
+                return
+            yield json.loads(payload)
+            pos += _RECORD.size + length
+
+    def replay(self, state, generation):
+        records = self.records()
+        header = next(records, None)
+        if header is None:
+            return 0
+        if header.get("op") != "begin" or header.get("generation") != generation:
+            logger.warning(f"Journal {self.path} does not belong to this snapshot, ignoring it")
+            return 0
+        count = 0
+        for record in records:
+            apply_record(state, record)
+            count += 1
+        return count
+
+
+def apply_record(state, record):
+    """Apply one journal record to a WorkflowState."""
+    op = record["op"]
+    if op == "link":
+        state.linked_items.append(record["link"])
+    elif op == "unlink":
+        if state.linked_items:
+            state.linked_items.pop()
+    elif op == "clear_links":
+        state.linked_items.clear()
+    elif op == "set":
+        value = record["value"]
+        if record["field"] == "legend_box" and value is not None:
+            value = tuple(value)
+        setattr(state, record["field"], value)
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+class SessionStore:
+    """
+    Binary session file: a snapshot plus an append-only journal.
+
+    The snapshot is an uncompressed .npz holding a small JSON header and the
+    detected symbols and OCR words in their DetectionTable / WordTable array
+    form (boxes, ids, confidences and an offset-indexed UTF-8 text blob). Saving writes a new snapshot
+    atomically and starts an empty journal; changes made in between, such as
+    new links, are appended to the journal instead of rewriting the file.
+
+    Loading reads only the header. The symbol and OCR tables are decoded the
+    first time they are used.
+
+    Args:
+        path (str | Path): Snapshot path; the journal lives next to it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.journal = SessionJournal(self.path.with_name(self.path.name + JOURNAL_SUFFIX))
+        self.generation = None
+
+    def save(self, state):
+        """Write a full snapshot of `state` and truncate the journal."""
+        arrays = {}
+        json_tables = {}
+        if _is_symbol_table(state.detected_symbols):
+            arrays.update(DetectionTable.from_records(state.detected_symbols).to_arrays("symbol"))
+        else:
+            json_tables["detected_symbols"] = state.detected_symbols
+        if _is_word_table(state.ocr_texts):
+            arrays.update(WordTable.from_records(state.ocr_texts).to_arrays("ocr"))
+        else:
+            json_tables["ocr_texts"] = state.ocr_texts
+
+        generation = uuid.uuid4().hex
+        header = {
+            "version": SESSION_VERSION,
+            "generation": generation,
+            "image_path": state.image_path,
+            "legend_path": state.legend_path,
+            "legend_box": state.legend_box,
+            "source_pdf": state.source_pdf,
+            "raster_dpi": state.raster_dpi,
+            "linked_items": list(state.linked_items),
+            "generated_tasks": list(state.generated_tasks),
+            "config": state.config,
+            "counts": {"detected_symbols": len(state.detected_symbols), "ocr_texts": len(state.ocr_texts)},
+            "json_tables": json_tables
+        }
+        arrays["header"] = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path)
+        self.journal.reset(generation)
+        self.generation = generation
+        logger.info(f"Session saved to {self.path}")
+
+    def append(self, op, **payload):
+        """Record a change in the journal without rewriting the snapshot."""
+        if self.generation is None:
+            raise RuntimeError("Session has no snapshot yet; call save() first")
+        self.journal.append(op, **payload)
+
+    def load(self):
+        """
+        Open the session.
+
+        Returns:
+            WorkflowState: State with scalar fields and links restored, journal
+                replayed, and detection tables loaded lazily.
+        """
+        with np.load(self.path) as npz:
+            header = json.loads(npz["header"].tobytes().decode("utf-8"))
+        if header.get("version") != SESSION_VERSION:
+            raise ValueError(f"Unsupported session version {header.get('version')} in {self.path}")
+
+        tables = header["json_tables"]
+        counts = header["counts"]
+        if "detected_symbols" in tables:
+            symbols = tables["detected_symbols"]
+        else:
+            symbols = LazyList(loader=lambda: self._read_table(DetectionTable, "symbol"),
+                               length=counts["detected_symbols"])
+        if "ocr_texts" in tables:
+            ocr_texts = tables["ocr_texts"]
+        else:
+            ocr_texts = LazyList(loader=lambda: self._read_table(WordTable, "ocr"),
+                                 length=counts["ocr_texts"])
+
+        state = WorkflowState(
+            image_path=header["image_path"],
+            legend_path=header["legend_path"],
+            legend_box=tuple(header["legend_box"]) if header["legend_box"] is not None else None,
+            source_pdf=header.get("source_pdf", ""),
+            raster_dpi=header.get("raster_dpi", 0),
+            detected_symbols=symbols,
+            ocr_texts=ocr_texts,
+            linked_items=header["linked_items"],
+            generated_tasks=header["generated_tasks"],
+            config=header["config"]
+        )
+        self.generation = header["generation"]
+        replayed = self.journal.replay(state, self.generation)
+        state.session = self
+        logger.info(f"Session loaded from {self.path} ({replayed} journal records)")
+        return state
+
+    def _read_table(self, table_cls, prefix):
+        with np.load(self.path) as npz:
+            arrays = {key: npz[key] for key in npz.files if key.startswith(prefix)}
+        return table_cls.from_arrays(arrays, prefix).to_records()
+
+
+def import_json_session(json_path, path=None):
+    """
+    Convert a session saved with WorkflowState.to_json into the binary format.
+
+    Args:
+        json_path (str): Existing JSON session.
+        path (str | None): Output path; defaults to json_path with the
+            session extension.
+
+    Returns:
+        SessionStore: Store for the new session file.
+    """
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    if data.get("legend_box") is not None:
+        data["legend_box"] = tuple(data["legend_box"])
+    state = WorkflowState(**data)
+    store = SessionStore(path or Path(json_path).with_suffix(SESSION_EXTENSION))
+    store.save(state)
+    return store
@@ -1,18 +1,29 @@
 import json
 from dataclasses import dataclass, asdict, field
 from typing import List, Tuple, Dict, Optional
+from utils.image_registry import ImageRegistry
 
 @dataclass
 class WorkflowState:
     image_path: str = ""
     legend_path: str = ""
     legend_box: Optional[Tuple[int, int, int, int]] = None
+    # PDF the blueprint image was rasterized from (empty for image uploads) and
+    # the DPI of that raster, so regions can be re-rendered at higher DPI.
+    source_pdf: str = ""
+    raster_dpi: int = 0
     detected_symbols: List[Dict] = field(default_factory=list)
     ocr_texts: List[Dict] = field(default_factory=list)
     linked_items: List[Tuple] = field(default_factory=list)
     generated_tasks: List[str] = field(default_factory=list)
     config: Dict = field(default_factory=dict)
 
+    def __post_init__(self):
+        # Decoded images shared between stages; not a field, so never serialized.
+        self.images = ImageRegistry()
+        # Open binary session (utils.session_store), if any, for journaling.
+        self.session = None
+
     def to_json(self, filepath: str):
         with open(filepath, 'w') as f:
             json.dump(asdict(self), f, indent=2)
@@ -27,15 +38,38 @@ class WorkflowState:
             print(f"⚠ Failed to load session: {e}")
             return WorkflowState()
 
+    def save_session(self, filepath: str):
+        from utils.session_store import SessionStore
+        self.session = SessionStore(filepath)
+        self.session.save(self)
+
+    @staticmethod
+    def load_session(filepath: str) -> "WorkflowState":
+        from utils.session_store import SessionStore, import_json_session
+        if filepath.lower().endswith(".json"):
+            return import_json_session(filepath).load()
+        return SessionStore(filepath).load()
+
+    def record(self, op: str, **payload):
+        """Apply a small change (e.g. a new link) and append it to the session journal."""
+        from utils.session_store import apply_record
+        apply_record(self, {"op": op, **payload})
+        if self.session is not None:
+            self.session.append(op, **payload)
+
     def reset(self):
         self.image_path = ""
         self.legend_path = ""
         self.legend_box = None
+        self.source_pdf = ""
+        self.raster_dpi = 0
         self.detected_symbols.clear()
         self.ocr_texts.clear()
         self.linked_items.clear()
         self.generated_tasks.clear()
         self.config.clear()
+        self.images.clear()
+        self.session = None
 
     def summary(self) -> Dict[str, str]:
         return {
@@ -0,0 +1,207 @@
+import math
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Templates are never shrunk below this size on the coarse pyramid levels.
+MIN_COARSE_SIDE = 8
+
+
+def load_symbol_icons(icon_dir="symbol_icons"):
+    """
+    Load the icon crops saved by SymbolLinker.
+
+    Returns:
+        dict[str, np.ndarray]: RGB icon per label (the file name without
+            extension, as written by SymbolLinker).
+    """
+    icons = {}
+    for path in sorted(Path(icon_dir).glob("*.png")):
+        icon = cv2.imread(str(path))
+        if icon is None:
+            logger.warning(f"Could not read icon {path}")
+            continue
+        icons[path.stem] = cv2.cvtColor(icon, cv2.COLOR_BGR2RGB)
+    return icons
+
+
+def non_max_suppression(boxes, scores, iou_threshold=0.3):
+    """
+    Greedy non-maximum suppression, vectorized over the remaining boxes.
+
+    Args:
+        boxes (np.ndarray): (N, 4) array of (x1, y1, x2, y2).
+        scores (np.ndarray): (N,) scores.
+        iou_threshold (float): Boxes overlapping a kept box by more than this
+            are dropped.
+
+    Returns:
+        np.ndarray: Indices of the kept boxes, best score first.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class SymbolMatcher:
+    """
+    Locate every occurrence of the legend icons on a full sheet.
+
+    Each icon is first correlated against a downsampled level of the sheet
+    pyramid, where cv2.matchTemplate (DFT correlation, integral-image
+    normalisation) is cheap. Only the local maxima that clear a relaxed
+    threshold there are re-checked at full resolution, in windows just larger
+    than the icon. The detections of all icons then go through one vectorized
+    non-maximum suppression pass.
+
+    Args:
+        icons (dict[str, np.ndarray]): RGB icon per label.
+        threshold (float): Minimum normalised correlation of a match.
+        scales (Iterable[float]): Icon scale factors to search.
+        max_levels (int): Deepest pyramid level used for the coarse pass.
+        coarse_margin (float): How far below threshold a coarse peak may score
+            and still be verified at full resolution.
+        max_candidates (int): Cap on verified candidates per icon and scale.
+        nms_iou (float): IoU above which overlapping matches are suppressed.
+    """
+
+    def __init__(self, icons, threshold=0.8, scales=(1.0,), max_levels=3, coarse_margin=0.15,
+                 max_candidates=5000, nms_iou=0.3):
+        self.threshold = threshold
+        self.max_levels = max_levels
+        self.coarse_margin = coarse_margin
+        self.max_candidates = max_candidates
+        self.nms_iou = nms_iou
+
+        self.templates = []
+        for label, icon in icons.items():
+            gray = cv2.cvtColor(icon, cv2.COLOR_RGB2GRAY) if icon.ndim == 3 else icon
+            for scale in scales:
+                template = gray if scale == 1.0 else cv2.resize(
+                    gray, None, fx=scale, fy=scale,
+                    interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+                if min(template.shape) < 3 or template.std() < 1.0:
+                    logger.warning(f"Skipping icon '{label}' at scale {scale}: too small or uniform to match")
+                    continue
+                self.templates.append((label, scale, template, self._coarse_level(template)))
+
+    @classmethod
+    def from_directory(cls, icon_dir="symbol_icons", **kwargs):
+        return cls(load_symbol_icons(icon_dir), **kwargs)
+
+    def _coarse_level(self, template):
+        side = min(template.shape[:2])
+        if side < 2 * MIN_COARSE_SIDE:
+            return 0
+        return min(self.max_levels, int(math.log2(side / MIN_COARSE_SIDE)))
+
+    def match(self, sheet):
+        """
+        Find all icon occurrences on a sheet.
+
+        Args:
+            sheet (np.ndarray): RGB or grayscale sheet image.
+
+        Returns:
+            list[dict]: Matches with "label", "score", "scale" and
+                "bounding_box" (x1, y1, x2, y2), best score first.
+        """
+        gray = cv2.cvtColor(sheet, cv2.COLOR_RGB2GRAY) if sheet.ndim == 3 else sheet
+        deepest = max((level for *_, level in self.templates), default=0)
+        pyramid = [gray]
+        for _ in range(deepest):
+            prev = pyramid[-1]
+            pyramid.append(cv2.resize(prev, (max(1, prev.shape[1] // 2), max(1, prev.shape[0] // 2)),
+                                      interpolation=cv2.INTER_AREA))
+
+        boxes, scores, labels, scales = [], [], [], []
+        for label, scale, template, level in self.templates:
+            for x, y, score in self._match_template(pyramid, template, level):
+                h, w = template.shape[:2]
+                boxes.append((x, y, x + w, y + h))
+                scores.append(score)
+                labels.append(label)
+                scales.append(scale)
+
+        if not boxes:
+            return []
+
+        boxes = np.array(boxes, dtype=np.int64)
+        scores = np.array(scores, dtype=np.float64)
+        keep = non_max_suppression(boxes, scores, self.nms_iou)
+        return [{
+            "label": labels[i],
+            "score": float(scores[i]),
+            "scale": scales[i],
+            "bounding_box": tuple(int(v) for v in boxes[i])
+        } for i in keep]
+
+    def _match_template(self, pyramid, template, level):
+        full = pyramid[0]
+        th, tw = template.shape[:2]
+        if th > full.shape[0] or tw > full.shape[1]:
+            return []
+
+        if level == 0:
+            result = cv2.matchTemplate(full, template, cv2.TM_CCOEFF_NORMED)
+            ys, xs = _local_peaks(result, self.threshold, self.max_candidates)
+            return [(int(x), int(y), float(result[y, x])) for x, y in zip(xs, ys)]
+
+        factor = 2 ** level
+        coarse = pyramid[level]
+        small = cv2.resize(template, (max(1, tw // factor), max(1, th // factor)), interpolation=cv2.INTER_AREA)
+        if small.shape[0] > coarse.shape[0] or small.shape[1] > coarse.shape[1]:
+            return []
+        result = cv2.matchTemplate(coarse, small, cv2.TM_CCOEFF_NORMED)
+        ys, xs = _local_peaks(result, self.threshold - self.coarse_margin, self.max_candidates)
+
+        matches = []
+        pad = factor + 2
+        for cx, cy in zip(xs, ys):
+            x0 = max(0, cx * factor - pad)
+            y0 = max(0, cy * factor - pad)
+            x1 = min(full.shape[1], cx * factor + tw + pad)
+            y1 = min(full.shape[0], cy * factor + th + pad)
+            window = full[y0:y1, x0:x1]
+            if window.shape[0] < th or window.shape[1] < tw:
+                continue
+            fine = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (fx, fy) = cv2.minMaxLoc(fine)
+            if score >= self.threshold:
+                matches.append((x0 + fx, y0 + fy, float(score)))
+        return matches
+
+
+def _local_peaks(result, threshold, max_peaks):
+    """Coordinates of 3x3 local maxima of a correlation map above threshold."""
+    cv2.patchNaNs(result, -1.0)
+    peaks = (result >= threshold) & (result >= cv2.dilate(result, np.ones((3, 3), np.uint8)))
+    ys, xs = np.nonzero(peaks)
+    if len(ys) > max_peaks:
+        top = np.argpartition(-result[ys, xs], max_peaks)[:max_peaks]
+        ys, xs = ys[top], xs[top]
+    return ys, xs
+
+
+def match_symbols(sheet, icon_dir="symbol_icons", **kwargs):
+    """Convenience wrapper: load the icons in icon_dir and match them on sheet."""
+    return SymbolMatcher.from_directory(icon_dir, **kwargs).match(sheet)
@@ -0,0 +1,70 @@
+import math
+
+import cv2
+import numpy as np
+
+
+class TilePyramid:
+    """
+    Multi-resolution copies of an image for fast zoomed-out rendering.
+
+    Level 0 is the image itself (no copy); every further level halves both
+    sides with area interpolation, down to roughly min_side pixels. A region
+    shown at a given scale is cut from the coarsest level that still has at
+    least that much detail, so rendering cost depends on the output size
+    rather than on the size of the full-resolution sheet.
+
+    Args:
+        image (np.ndarray): Full-resolution image (H, W[, C]).
+        min_side (int): Stop adding levels once the longer side is below this.
+    """
+
+    def __init__(self, image, min_side=1024):
+        self.levels = [image]
+        while max(self.levels[-1].shape[:2]) > min_side:
+            prev = self.levels[-1]
+            size = (max(1, prev.shape[1] // 2), max(1, prev.shape[0] // 2))
+            self.levels.append(cv2.resize(prev, size, interpolation=cv2.INTER_AREA))
+
+    @property
+    def size(self):
+        """Full-resolution (width, height)."""
+        return self.levels[0].shape[1], self.levels[0].shape[0]
+
+    def level_for_scale(self, scale):
+        """Coarsest level whose resolution is still at least `scale`."""
+        if scale >= 1:
+            return 0
+        return min(len(self.levels) - 1, int(math.floor(math.log2(1 / scale))))
+
+    def render(self, scale, x0, y0, x1, y1):
+        """
+        Render part of the image at the given display scale.
+
+        Args:
+            scale (float): Display pixels per full-resolution pixel.
+            x0, y0, x1, y1 (int): Output region in display pixels.
+
+        Returns:
+            np.ndarray: The region, (y1 - y0, x1 - x0) pixels in size, or an
+                empty array if it lies outside the image.
+        """
+        full_w, full_h = self.size
+        x1 = min(x1, int(full_w * scale))
+        y1 = min(y1, int(full_h * scale))
+        if x1 <= x0 or y1 <= y0:
+            return np.empty((0, 0) + self.levels[0].shape[2:], self.levels[0].dtype)
+
+        level = self.level_for_scale(scale)
+        source = self.levels[level]
+        level_scale = source.shape[1] / full_w
+        factor = level_scale / scale  # source pixels per display pixel
+
+        sx0 = int(math.floor(x0 * factor))
+        sy0 = int(math.floor(y0 * factor))
+        sx1 = min(source.shape[1], int(math.ceil(x1 * factor)))
+        sy1 = min(source.shape[0], int(math.ceil(y1 * factor)))
+        crop = source[sy0:max(sy1, sy0 + 1), sx0:max(sx1, sx0 + 1)]
+
+        interpolation = cv2.INTER_AREA if factor > 1 else cv2.INTER_LINEAR
+        return cv2.resize(crop, (x1 - x0, y1 - y0), interpolation=interpolation)